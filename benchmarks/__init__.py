@@ -0,0 +1,3 @@
+"""
+Benchmarks for the galo_startup_commands library.
+"""
@@ -0,0 +1,151 @@
+"""
+Benchmarks of dependency graph construction and sorting.
+
+Usage: python -m benchmarks.graph --output results.json [--compare baseline.json]
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import galo_startup_commands
+from galo_startup_commands import (
+    DependencyGraphNodeStartupCommand,
+    FunctionStartupCommand,
+    reverse_graph,
+    to_compact_graph,
+    to_graph,
+    topological_sort,
+)
+
+SHAPES = ("wide", "chain", "orders", "dense")
+SIZES = (10, 100, 1_000, 10_000, 100_000)
+
+
+def noop() -> None:
+    pass
+
+
+def generate_nodes(shape: str, size: int, seed: int = 0) -> List[DependencyGraphNodeStartupCommand]:
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown graph shape: shape={shape}.")
+    rng = random.Random(seed)
+    nodes = []
+    for index in range(size):
+        after: Optional[List[str]] = None
+        order: Optional[int] = None
+        if shape == "chain" and index > 0:
+            after = [f"node{index - 1}"]
+        elif shape == "orders":
+            order = index // 10
+        elif shape == "dense" and index > 0:
+            after = [f"node{rng.randrange(index)}" for _ in range(min(index, 8))]
+        nodes.append(
+            DependencyGraphNodeStartupCommand(
+                FunctionStartupCommand(noop), name=f"node{index}", after=after, order=order
+            )
+        )
+    return nodes
+
+
+def measure(function: Callable[[], Any], repeat: int, memory: bool) -> Dict[str, Any]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    peak_memory = None
+    if memory:
+        tracemalloc.start()
+        function()
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "times": times,
+        "best": min(times),
+        "median": statistics.median(times),
+        "peak_memory": peak_memory,
+    }
+
+
+def run(shapes: Sequence[str], sizes: Sequence[int], repeat: int, memory: bool) -> List[Dict]:
+    results = []
+    for shape in shapes:
+        for size in sizes:
+            nodes = generate_nodes(shape, size)
+            graph = to_graph(nodes)
+            compact_graph = to_compact_graph(nodes)
+            operations: Dict[str, Callable[[], Any]] = {
+                "to_graph": lambda: to_graph(nodes),
+                "reverse_graph": lambda: reverse_graph(graph),
+                "topological_sort": lambda: topological_sort(graph),
+                "to_compact_graph": lambda: to_compact_graph(nodes),
+                "topological_sort_compact": lambda: topological_sort(compact_graph),
+            }
+            for operation, function in operations.items():
+                result = measure(function, repeat, memory)
+                result.update(
+                    shape=shape,
+                    size=size,
+                    operation=operation,
+                    edges=sum(len(v) for v in graph.values()),
+                    compact_edges=len(compact_graph.successor_targets),
+                )
+                results.append(result)
+                print(
+                    f"{shape:>8} {size:>8} {operation:>26} "
+                    f"best={result['best'] * 1000:10.3f}ms "
+                    f"median={result['median'] * 1000:10.3f}ms",
+                    file=sys.stderr,
+                )
+    return results
+
+
+def compare(results: List[Dict], baseline: List[Dict]) -> None:
+    baseline_by_key = {(r["shape"], r["size"], r["operation"]): r for r in baseline}
+    for result in results:
+        previous = baseline_by_key.get((result["shape"], result["size"], result["operation"]))
+        if previous is None or previous["best"] == 0:
+            continue
+        ratio = result["best"] / previous["best"]
+        print(
+            f"{result['shape']:>8} {result['size']:>8} {result['operation']:>26} " f"{ratio:8.2f}x",
+            file=sys.stderr,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=SHAPES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-memory", dest="memory", action="store_false")
+    parser.add_argument("--output", help="Path of the JSON results file.")
+    parser.add_argument("--compare", help="Path of a previous JSON results file.")
+    args = parser.parse_args()
+
+    results = run(args.shapes, args.sizes, args.repeat, args.memory)
+    data = {
+        "version": galo_startup_commands.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.output is None:
+        json.dump(data, sys.stdout, indent=2)
+    else:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=2)
+    if args.compare is not None:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            compare(results, json.load(file)["results"])
+
+
+if __name__ == "__main__":
+    main()
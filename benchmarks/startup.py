@@ -0,0 +1,199 @@
+"""
+End-to-end startup and shutdown latency of simulated applications.
+
+Usage: python -m benchmarks.startup --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Sequence
+
+import galo_startup_commands
+from galo_startup_commands import (
+    DependencyGraphNodeStartupCommand,
+    GraphStartupCommand,
+    SequenceStartupCommand,
+    StartupCommand,
+    startup_command,
+    to_compact_graph,
+    topological_sort,
+)
+
+KINDS = ("async", "sync")
+EXECUTORS = {
+    "async": ("sequence_async", "graph_async"),
+    "sync": ("sequence_sync", "graph_sync"),
+}
+
+
+def busy(duration: float) -> None:
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        pass
+
+
+def make_function(kind: str, index: int, io_delay: float, cpu_time: float) -> Callable:
+    if kind == "async" and index % 2 == 0:
+
+        async def async_function() -> None:
+            busy(cpu_time)
+            await asyncio.sleep(io_delay)
+
+        return async_function
+
+    if kind == "async":
+
+        async def async_generator_function() -> Any:
+            busy(cpu_time)
+            await asyncio.sleep(io_delay)
+            yield
+            await asyncio.sleep(io_delay)
+
+        return async_generator_function
+
+    def generator_function() -> Any:
+        busy(cpu_time)
+        time.sleep(io_delay)
+        yield
+        time.sleep(io_delay)
+
+    return generator_function
+
+
+def build_app(
+    kind: str, count: int, io_delay: float, cpu_time: float, width: int, seed: int = 0
+) -> List[DependencyGraphNodeStartupCommand]:
+    rng = random.Random(seed)
+    commands = []
+    for index in range(count):
+        layer = index // width
+        after = None
+        if layer > 0:
+            previous_layer = range((layer - 1) * width, min(layer * width, count))
+            after = [f"command{i}" for i in rng.sample(previous_layer, min(2, len(previous_layer)))]
+        function = make_function(kind, index, io_delay, cpu_time)
+        startup_command(name=f"command{index}", after=after)(function)
+        commands.append(getattr(function, "startup_command"))
+    return commands
+
+
+def create_executor(name: str, commands: Sequence[DependencyGraphNodeStartupCommand]) -> Any:
+    graph = to_compact_graph(commands)
+    if name.startswith("sequence"):
+        sorted_commands = topological_sort(graph)
+        return SequenceStartupCommand(sorted_commands)
+    return GraphStartupCommand(graph)
+
+
+def run_executor(name: str, command: StartupCommand) -> Dict[str, float]:
+    if name.endswith("async"):
+
+        async def run() -> Dict[str, float]:
+            start = time.perf_counter()
+            await command.startup_async()
+            middle = time.perf_counter()
+            await command.shutdown_async()
+            return {"startup": middle - start, "shutdown": time.perf_counter() - middle}
+
+        return asyncio.run(run())
+
+    start = time.perf_counter()
+    command.startup()
+    middle = time.perf_counter()
+    command.shutdown()
+    return {"startup": middle - start, "shutdown": time.perf_counter() - middle}
+
+
+def measure_overhead(count: int, repeat: int) -> Dict[str, float]:
+    def noop() -> None:
+        pass
+
+    timings: Dict[str, List[float]] = {executor: [] for executor in ("direct", *EXECUTORS["sync"])}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(count):
+            noop()
+        timings["direct"].append(time.perf_counter() - start)
+
+        for executor in EXECUTORS["sync"]:
+            commands = [
+                getattr(startup_command(name=f"command{i}")(lambda: None), "startup_command")
+                for i in range(count)
+            ]
+            command = create_executor(executor, commands)
+            start = time.perf_counter()
+            command.startup()
+            timings[executor].append(time.perf_counter() - start)
+            command.shutdown()
+    return {f"{executor}_per_command": min(times) / count for executor, times in timings.items()}
+
+
+def run(
+    counts: Sequence[int], io_delay: float, cpu_time: float, width: int, repeat: int
+) -> List[Dict[str, Any]]:
+    results = []
+    for kind in KINDS:
+        for count in counts:
+            for executor in EXECUTORS[kind]:
+                startups = []
+                shutdowns = []
+                for _ in range(repeat):
+                    commands = build_app(kind, count, io_delay, cpu_time, width)
+                    timings = run_executor(executor, create_executor(executor, commands))
+                    startups.append(timings["startup"])
+                    shutdowns.append(timings["shutdown"])
+                result: Dict[str, Any] = {
+                    "kind": kind,
+                    "count": count,
+                    "executor": executor,
+                    "startup_median": statistics.median(startups),
+                    "shutdown_median": statistics.median(shutdowns),
+                    "startups": startups,
+                    "shutdowns": shutdowns,
+                }
+                results.append(result)
+                print(
+                    f"{kind:>6} {count:>6} {executor:>15} "
+                    f"startup={result['startup_median'] * 1000:10.3f}ms "
+                    f"shutdown={result['shutdown_median'] * 1000:10.3f}ms",
+                    file=sys.stderr,
+                )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--counts", nargs="+", type=int, default=(10, 100, 500))
+    parser.add_argument("--io-delay", type=float, default=0.002)
+    parser.add_argument("--cpu-time", type=float, default=0.0001)
+    parser.add_argument("--width", type=int, default=10, help="Commands per dependency layer.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Path of the JSON results file.")
+    args = parser.parse_args()
+
+    overhead = measure_overhead(max(args.counts), args.repeat)
+    for key, value in overhead.items():
+        print(f"overhead {key}={value * 1e6:.3f}us", file=sys.stderr)
+    data = {
+        "version": galo_startup_commands.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": vars(args),
+        "overhead": overhead,
+        "results": run(args.counts, args.io_delay, args.cpu_time, args.width, args.repeat),
+    }
+    if args.output is None:
+        json.dump(data, sys.stdout, indent=2)
+    else:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,28 +2,63 @@
 A library that allows you to flexibly manage the startup and shutdown of an application.
 """
 
+import ast
+import asyncio
+import hashlib
+import json
+import mmap
 import os
-from collections import defaultdict
+import pickle  # nosec B403 - only application-owned cache files are unpickled
+import signal
+import struct
+import tempfile
+import threading
+from array import array
+from asyncio import FIRST_COMPLETED, CancelledError
+from collections import defaultdict, deque
+from concurrent.futures import (
+    Executor,
+    Future,
+    InvalidStateError,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import contextmanager, nullcontext
+from heapq import heapify, heappop, heappush
 from importlib import import_module
+from importlib._bootstrap import _DeadlockError  # type: ignore
+from importlib.abc import PathEntryFinder
+from importlib.machinery import ModuleSpec
+from importlib.util import find_spec
 from inspect import (
     isasyncgenfunction,
     iscoroutinefunction,
     isfunction,
     isgeneratorfunction,
 )
-from pkgutil import walk_packages
-from types import ModuleType, TracebackType
+from itertools import accumulate, chain, count
+from operator import itemgetter, sub
+from pkgutil import iter_modules, walk_packages
+from time import perf_counter, perf_counter_ns
+from types import CodeType, ModuleType, TracebackType
 from typing import (
+    AbstractSet,
     Any,
     AsyncGenerator,
     Awaitable,
+    BinaryIO,
     Callable,
     Collection,
+    ContextManager,
     DefaultDict,
     Dict,
     Generator,
+    Generic,
     Iterable,
+    Iterator,
     List,
+    Mapping,
+    NamedTuple,
     Optional,
     Sequence,
     Set,
@@ -31,25 +66,60 @@ from typing import (
     Type,
     TypeVar,
     Union,
+    cast,
 )
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore
+
 __all__ = [
     "StartupCommand",
     "FunctionStartupCommand",
     "AsyncFunctionStartupCommand",
     "GeneratorFunctionStartupCommand",
     "AsyncGeneratorFunctionStartupCommand",
+    "ResultCache",
+    "CachedFunctionStartupCommand",
+    "SharedResourceStartupCommand",
     "DependencyGraphNode",
     "DependencyGraphNodeStartupCommand",
+    "StartupTimeoutException",
+    "ShutdownTimeoutException",
     "ContextManagerStartupCommand",
     "SequenceStartupCommand",
     "startup_command",
     "import_module",
     "import_submodules",
+    "import_startup_command_modules",
+    "StartupCommandReference",
+    "DiscoveryManifest",
     "fetch_startup_commands",
     "to_graph",
+    "to_subgraph",
+    "CompactGraph",
+    "compact_graph",
+    "to_compact_graph",
+    "GraphEdge",
+    "GraphCycle",
     "GraphCycleException",
+    "find_cycles",
+    "validate_graph",
     "topological_sort",
+    "StartupPlan",
+    "compile_startup_plan",
+    "load_startup_plan",
+    "GraphStartupCommand",
+    "EventLoopThreadStartupCommand",
+    "run_until_signal",
+    "run_until_signal_async",
+    "TraceEvent",
+    "Tracer",
+    "CriticalPathReport",
+    "analyze_critical_path",
+    "SimulationReport",
+    "simulate_startup",
 ]
 
 
@@ -74,6 +144,9 @@ class FunctionStartupCommand(StartupCommand):
     def __init__(self, function: Callable[[], None]) -> None:
         self.__function = function
 
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({_get_function_name(self.__function)})"
+
     def startup(self) -> None:
         self.__function()
 
@@ -91,6 +164,9 @@ class AsyncFunctionStartupCommand(StartupCommand):
     def __init__(self, function: Callable[[], Awaitable[None]]) -> None:
         self.__function = function
 
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({_get_function_name(self.__function)})"
+
     def startup(self) -> None:
         raise Exception(
             f"Cannot call an asynchronous function from a synchronous one: "
@@ -112,6 +188,9 @@ class GeneratorFunctionStartupCommand(StartupCommand):
         self.__function = function
         self.__generator: Optional[Generator[None, None, None]] = None
 
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({_get_function_name(self.__function)})"
+
     def startup(self) -> None:
         if self.__generator is not None:
             return
@@ -145,6 +224,9 @@ class AsyncGeneratorFunctionStartupCommand(StartupCommand):
         self.__function = function
         self.__generator: Optional[AsyncGenerator[None, None]] = None
 
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({_get_function_name(self.__function)})"
+
     def startup(self) -> None:
         raise Exception(
             f"Cannot call an asynchronous generator function from a synchronous one: "
@@ -179,6 +261,326 @@ class AsyncGeneratorFunctionStartupCommand(StartupCommand):
                 pass
 
 
+def _get_function_name(function: Callable) -> str:
+    try:
+        return f"{function.__module__}.{function.__qualname__}"
+    except AttributeError:
+        return repr(function)
+
+
+class ResultCache:
+    def __init__(self, directory: str, max_size: Optional[int] = None) -> None:
+        if max_size is not None and max_size < 0:
+            raise ValueError(f"Invalid max size: max_size={max_size}.")
+        self.__directory = directory
+        self.__max_size = max_size
+
+    @property
+    def directory(self) -> str:
+        return self.__directory
+
+    @property
+    def max_size(self) -> Optional[int]:
+        return self.__max_size
+
+    def __get_path(self, key: str) -> str:
+        return os.path.join(self.__directory, f"{key}{_CACHE_SUFFIX}")
+
+    def load(self, key: str) -> Any:
+        path = self.__get_path(key)
+        try:
+            value = _map_cache_entry(path)
+            os.utime(path)
+        except Exception:
+            # Unpickling can fail in arbitrary ways, e.g. when a class was renamed or moved.
+            raise KeyError(key) from None
+        return value
+
+    def store(self, key: str, value: Any) -> None:
+        os.makedirs(self.__directory, exist_ok=True)
+        _write_cache_entry(self.__get_path(key), value)
+        self.evict(keep=key)
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        if self.__max_size is None:
+            return
+        entries = []
+        for entry in os.scandir(self.__directory):
+            if entry.name.endswith(_CACHE_SUFFIX) and entry.name != f"{keep}{_CACHE_SUFFIX}":
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        size = sum(map(itemgetter(1), entries))
+        if keep is not None:
+            size += os.stat(self.__get_path(keep)).st_size
+        for _, entry_size, path in sorted(entries):
+            if size <= self.__max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+
+_CACHE_SUFFIX = ".pickle"
+_CACHE_HEADER = struct.Struct("<4sQQ")
+_CACHE_BUFFER = struct.Struct("<QQ")
+_CACHE_MAGIC = b"GSC1"
+_CACHE_ALIGNMENT = 64
+
+
+def _write_cache_entry(path: str, value: Any) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            _dump_cache_entry(file, value)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def _map_cache_entry(path: str) -> Any:
+    with open(path, "rb") as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return _load_cache_entry(memoryview(mapping))
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _dump_cache_entry(file: BinaryIO, value: Any) -> None:
+    # Out-of-band buffers (protocol 5) are stored raw so that loading can map them without a copy.
+    buffers: List[pickle.PickleBuffer] = []
+    try:
+        data = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+        raw_buffers = [buffer.raw() for buffer in buffers]
+    except BufferError:
+        data = pickle.dumps(value, protocol=5)
+        raw_buffers = []
+    offset = _CACHE_HEADER.size + _CACHE_BUFFER.size * len(raw_buffers) + len(data)
+    layout = []
+    for raw_buffer in raw_buffers:
+        offset += -offset % _CACHE_ALIGNMENT
+        layout.append((offset, raw_buffer.nbytes))
+        offset += raw_buffer.nbytes
+    file.write(_CACHE_HEADER.pack(_CACHE_MAGIC, len(data), len(raw_buffers)))
+    for buffer_offset, length in layout:
+        file.write(_CACHE_BUFFER.pack(buffer_offset, length))
+    file.write(data)
+    for (buffer_offset, _), raw_buffer in zip(layout, raw_buffers):
+        file.write(bytes(buffer_offset - file.tell()))
+        file.write(raw_buffer)
+
+
+def _load_cache_entry(view: memoryview) -> Any:
+    magic, data_size, buffer_count = _CACHE_HEADER.unpack_from(view)
+    if magic != _CACHE_MAGIC:
+        raise ValueError(f"Invalid cache entry: magic={magic!r}.")
+    position = _CACHE_HEADER.size
+    buffers = []
+    for _ in range(buffer_count):
+        offset, length = _CACHE_BUFFER.unpack_from(view, position)
+        position += _CACHE_BUFFER.size
+        buffers.append(view[offset : offset + length])
+    # The cache directory is owned by the application and trusted like its code.
+    return pickle.loads(view[position : position + data_size], buffers=buffers)  # nosec B301
+
+
+def _has_stable_code(function: Callable[..., Any]) -> bool:
+    return isinstance(getattr(function, "__code__", None), CodeType) and not getattr(
+        function, "__closure__", None
+    )
+
+
+def _update_code_hash(key: "hashlib._Hash", code: CodeType) -> None:
+    # Hashes of code objects and reprs of sets vary between processes, so both are spelled out.
+    key.update(code.co_code)
+    key.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            _update_code_hash(key, const)
+        elif isinstance(const, frozenset):
+            key.update(repr(sorted(map(repr, const))).encode())
+        else:
+            key.update(repr(const).encode())
+
+
+class CachedFunctionStartupCommand(StartupCommand):
+    def __init__(
+        self,
+        function: Callable[[], Any],
+        cache: ResultCache,
+        files: Collection[str] = (),
+        version: Optional[str] = None,
+        config: Any = None,
+    ) -> None:
+        if version is None and not _has_stable_code(function):
+            raise ValueError(
+                f"Cached closures and callables without code need a version: "
+                f"function={function!r}."
+            )
+        self.__function = function
+        self.__cache = cache
+        self.__files = files
+        try:
+            self.__parameters = json.dumps([version, config], sort_keys=True)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid cache config: config={config!r}.") from None
+        self.__result: Any = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({_get_function_name(self.__function)})"
+
+    @property
+    def result(self) -> Any:
+        return self.__result
+
+    def get_key(self) -> str:
+        key = hashlib.sha256()
+        key.update(_get_function_name(self.__function).encode())
+        code = getattr(self.__function, "__code__", None)
+        if isinstance(code, CodeType):
+            _update_code_hash(key, code)
+        key.update(self.__parameters.encode())
+        for path in self.__files:
+            key.update(path.encode())
+            key.update(_hash_file(path).encode())
+        return key.hexdigest()
+
+    def startup(self) -> None:
+        key = self.get_key()
+        try:
+            self.__result = self.__cache.load(key)
+        except KeyError:
+            result = self.__function()
+            self.__cache.store(key, result)
+            self.__result = result
+
+    def shutdown(self, exception: Optional[BaseException] = None) -> None:
+        self.__result = None
+
+    async def startup_async(self) -> None:
+        self.startup()
+
+    async def shutdown_async(self, exception: Optional[BaseException] = None) -> None:
+        self.shutdown(exception)
+
+
+class SharedResourceStartupCommand(StartupCommand):
+    def __init__(
+        self, function: Callable[[], Any], path: str, version: Optional[str] = None
+    ) -> None:
+        self.__function = function
+        self.__path = path
+        self.__version = version
+        self.__users_file: Optional[BinaryIO] = None
+        self.__result: Any = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({_get_function_name(self.__function)}, path={self.__path!r})"
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.__version
+
+    @property
+    def result(self) -> Any:
+        return self.__result
+
+    def get_key(self) -> str:
+        key = hashlib.sha256()
+        key.update(_get_function_name(self.__function).encode())
+        key.update(json.dumps(self.__version).encode())
+        return key.hexdigest()
+
+    @contextmanager
+    def __lock(self) -> Iterator[None]:
+        if fcntl is None:
+            raise Exception(f"Shared resources require fcntl: path={self.__path!r}.")
+        path = f"{self.__path}.lock"
+        while True:
+            file = open(path, "ab")
+            fcntl.flock(file, fcntl.LOCK_EX)
+            # The last user removes the lock file, so a lock taken on a removed file is retried.
+            try:
+                if os.path.samestat(os.fstat(file.fileno()), os.stat(path)):
+                    break
+            except FileNotFoundError:
+                pass
+            file.close()
+        try:
+            yield
+        finally:
+            file.close()
+
+    def __load(self, key: str) -> Any:
+        try:
+            entry_key, result = _map_cache_entry(self.__path)
+        except Exception:
+            # As in ResultCache.load, an entry that cannot be read is a miss and gets rebuilt.
+            entry_key = result = None
+        if entry_key == key:
+            return result
+        _write_cache_entry(self.__path, (key, self.__function()))
+        return _map_cache_entry(self.__path)[1]
+
+    def startup(self) -> None:
+        if self.__users_file is not None:
+            return
+        key = self.get_key()
+        with self.__lock():
+            # Every user holds a shared lock on the users file until shutdown.
+            users_file = open(f"{self.__path}.users", "ab")
+            try:
+                try:
+                    fcntl.flock(users_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    fcntl.flock(users_file, fcntl.LOCK_SH)
+                else:
+                    # Nobody else uses the file, so it was left behind by a process that died.
+                    _remove_file(self.__path)
+                    fcntl.flock(users_file, fcntl.LOCK_SH)
+                result = self.__load(key)
+            except BaseException:
+                users_file.close()
+                raise
+        self.__users_file = users_file
+        self.__result = result
+
+    def shutdown(self, exception: Optional[BaseException] = None) -> None:
+        users_file = self.__users_file
+        if users_file is None:
+            return
+        self.__users_file = None
+        self.__result = None
+        with self.__lock():
+            try:
+                fcntl.flock(users_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                pass
+            else:
+                for suffix in ("", ".users", ".lock"):
+                    _remove_file(f"{self.__path}{suffix}")
+            finally:
+                users_file.close()
+
+    async def startup_async(self) -> None:
+        self.startup()
+
+    async def shutdown_async(self, exception: Optional[BaseException] = None) -> None:
+        self.shutdown(exception)
+
+
 class DependencyGraphNode:
     @property
     def name(self) -> Optional[str]:
@@ -196,6 +598,30 @@ class DependencyGraphNode:
     def order(self) -> Optional[int]:
         raise NotImplementedError()
 
+    @property
+    def lazy(self) -> bool:
+        return False
+
+    @property
+    def timeout(self) -> Optional[float]:
+        return None
+
+    @property
+    def background(self) -> bool:
+        return False
+
+    @property
+    def blocking(self) -> bool:
+        return False
+
+    @property
+    def resources(self) -> Optional[Mapping[str, int]]:
+        return None
+
+    @property
+    def shutdown_timeout(self) -> Optional[float]:
+        return None
+
 
 class DependencyGraphNodeStartupCommand(DependencyGraphNode, StartupCommand):
     def __init__(
@@ -205,12 +631,43 @@ class DependencyGraphNodeStartupCommand(DependencyGraphNode, StartupCommand):
         after: Optional[Collection[str]] = None,
         before: Optional[Collection[str]] = None,
         order: Optional[int] = None,
+        lazy: bool = False,
+        timeout: Optional[float] = None,
+        background: bool = False,
+        blocking: bool = False,
+        resources: Optional[Mapping[str, int]] = None,
+        shutdown_timeout: Optional[float] = None,
     ) -> None:
+        if timeout is not None and timeout <= 0:
+            raise ValueError(f"Invalid timeout: timeout={timeout}.")
+        if shutdown_timeout is not None and shutdown_timeout <= 0:
+            raise ValueError(f"Invalid shutdown timeout: shutdown_timeout={shutdown_timeout}.")
+        for resource, amount in (resources or {}).items():
+            if amount < 1:
+                raise ValueError(f"Invalid resource amount: resource={resource}, amount={amount}.")
+        if blocking and isinstance(
+            command, (AsyncFunctionStartupCommand, AsyncGeneratorFunctionStartupCommand)
+        ):
+            raise TypeError(f"Blocking startup command must be synchronous: command={command!r}.")
         self.__command = command
         self.__name = name
         self.__after = after
         self.__before = before
         self.__order = order
+        self.__lazy = lazy
+        self.__timeout = timeout
+        self.__background = background
+        self.__blocking = blocking
+        self.__resources = resources
+        self.__shutdown_timeout = shutdown_timeout
+        self.__executor: Optional[Executor] = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.__command!r}, name={self.__name!r})"
+
+    @property
+    def command(self) -> StartupCommand:
+        return self.__command
 
     @property
     def name(self) -> Optional[str]:
@@ -228,17 +685,127 @@ class DependencyGraphNodeStartupCommand(DependencyGraphNode, StartupCommand):
     def order(self) -> Optional[int]:
         return self.__order
 
+    @property
+    def lazy(self) -> bool:
+        return self.__lazy
+
+    @property
+    def timeout(self) -> Optional[float]:
+        return self.__timeout
+
+    @property
+    def background(self) -> bool:
+        return self.__background
+
+    @property
+    def blocking(self) -> bool:
+        return self.__blocking
+
+    @property
+    def resources(self) -> Optional[Mapping[str, int]]:
+        return self.__resources
+
+    @property
+    def shutdown_timeout(self) -> Optional[float]:
+        return self.__shutdown_timeout
+
     def startup(self) -> None:
-        self.__command.startup()
+        if self.__timeout is None:
+            self.__command.startup()
+            return
+        elapsed = _call_with_timeout(f"startup:{self!r}", self.__command.startup, self.__timeout)
+        if elapsed is not None:
+            raise StartupTimeoutException(self, elapsed)
 
     def shutdown(self, exception: Optional[BaseException] = None) -> None:
         self.__command.shutdown(exception)
 
     async def startup_async(self) -> None:
-        await self.__command.startup_async()
+        if self.__blocking:
+            awaitable = self.__run_blocking(self.__command.startup)
+        else:
+            awaitable = self.__command.startup_async()
+        try:
+            if self.__timeout is None:
+                await awaitable
+                return
+            start = perf_counter()
+            try:
+                await asyncio.wait_for(awaitable, self.__timeout)
+            except asyncio.TimeoutError:
+                raise StartupTimeoutException(self, perf_counter() - start) from None
+        except BaseException:
+            self.__shutdown_executor()
+            raise
 
     async def shutdown_async(self, exception: Optional[BaseException] = None) -> None:
-        await self.__command.shutdown_async(exception)
+        if not self.__blocking:
+            await self.__command.shutdown_async(exception)
+            return
+        try:
+            await self.__run_blocking(lambda: self.__command.shutdown(exception))
+        finally:
+            self.__shutdown_executor()
+
+    async def __run_blocking(self, function: Callable[[], None]) -> None:
+        # Generators are resumed on the thread that started them, which thread-bound resources need.
+        if self.__executor is None and isinstance(self.__command, GeneratorFunctionStartupCommand):
+            self.__executor = ThreadPoolExecutor(1)
+        await asyncio.get_running_loop().run_in_executor(self.__executor, function)
+
+    def __shutdown_executor(self) -> None:
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False)
+            self.__executor = None
+
+
+class StartupTimeoutException(Exception):
+    def __init__(self, command: StartupCommand, elapsed: float, *args: Any) -> None:
+        super().__init__(command, elapsed, *args)
+
+    def __str__(self) -> str:
+        return f"Startup command timed out: command={self.command!r}, elapsed={self.elapsed:.3f}s."
+
+    @property
+    def command(self) -> StartupCommand:
+        return self.args[0]
+
+    @property
+    def elapsed(self) -> float:
+        return self.args[1]
+
+
+class ShutdownTimeoutException(Exception):
+    def __init__(self, overruns: Mapping[StartupCommand, float], *args: Any) -> None:
+        super().__init__(overruns, *args)
+
+    def __str__(self) -> str:
+        return f"Shutdown timed out: commands={list(self.overruns)!r}."
+
+    @property
+    def overruns(self) -> Mapping[StartupCommand, float]:
+        return self.args[0]
+
+
+def _call_with_timeout(name: str, function: Callable[[], None], timeout: float) -> Optional[float]:
+    errors: List[BaseException] = []
+
+    def target() -> None:
+        try:
+            function()
+        except BaseException as e:
+            errors.append(e)
+
+    # A thread cannot be interrupted, so a command that overruns is abandoned in a daemon thread.
+    thread = threading.Thread(target=target, name=name, daemon=True)
+    start = perf_counter()
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        return perf_counter() - start
+    if errors:
+        raise errors[0]
+    return None
 
 
 class ContextManagerStartupCommand(StartupCommand):
@@ -273,7 +840,8 @@ class SequenceStartupCommand(ContextManagerStartupCommand):
     def startup(self) -> None:
         for command in self.__commands:
             try:
-                command.startup()
+                with _trace(command, "startup"):
+                    command.startup()
             except BaseException as e:
                 self.shutdown(e)
                 raise e
@@ -281,19 +849,22 @@ class SequenceStartupCommand(ContextManagerStartupCommand):
                 self.__started_commands.append(command)
 
     def shutdown(self, exception: Optional[BaseException] = None) -> None:
-        try:
+        error: Optional[BaseException] = None
+        while self.__started_commands:
             command = self.__started_commands.pop()
-        except IndexError:
-            return
-        try:
-            command.shutdown(exception)
-        finally:
-            self.shutdown(exception)
+            try:
+                with _trace(command, "shutdown"):
+                    command.shutdown(exception)
+            except BaseException as e:
+                error = _chain_exception(e, error)
+        if error is not None:
+            raise error
 
     async def startup_async(self) -> None:
         for command in self.__commands:
             try:
-                await command.startup_async()
+                with _trace(command, "startup_async"):
+                    await command.startup_async()
             except BaseException as e:
                 await self.shutdown_async(e)
                 raise e
@@ -301,14 +872,28 @@ class SequenceStartupCommand(ContextManagerStartupCommand):
                 self.__started_commands.append(command)
 
     async def shutdown_async(self, exception: Optional[BaseException] = None) -> None:
-        try:
+        error: Optional[BaseException] = None
+        while self.__started_commands:
             command = self.__started_commands.pop()
-        except IndexError:
-            return
-        try:
-            await command.shutdown_async(exception)
-        finally:
-            await self.shutdown_async(exception)
+            try:
+                with _trace(command, "shutdown_async"):
+                    await command.shutdown_async(exception)
+            except BaseException as e:
+                error = _chain_exception(e, error)
+        if error is not None:
+            raise error
+
+
+def _chain_exception(exception: BaseException, context: Optional[BaseException]) -> BaseException:
+    if context is None or exception.__context__ is not None:
+        return exception
+    cause: Optional[BaseException] = context
+    while cause is not None:
+        if cause is exception:
+            return exception
+        cause = cause.__context__
+    exception.__context__ = context
+    return exception
 
 
 C1 = TypeVar("C1", bound=Callable)
@@ -321,15 +906,45 @@ def startup_command(
     after: Optional[Collection[str]] = None,
     before: Optional[Collection[str]] = None,
     order: Optional[int] = None,
+    lazy: bool = False,
+    timeout: Optional[float] = None,
+    background: bool = False,
+    blocking: bool = False,
+    resources: Optional[Mapping[str, int]] = None,
+    shutdown_timeout: Optional[float] = None,
 ) -> Union[C1, Callable[[C2], C2]]:
     if function is None:
 
         def wrapper(function: C2) -> C2:
-            return _startup_command(function, name, after, before, order)
+            return _startup_command(
+                function,
+                name,
+                after,
+                before,
+                order,
+                lazy,
+                timeout,
+                background,
+                blocking,
+                resources,
+                shutdown_timeout,
+            )
 
         return wrapper
     else:
-        return _startup_command(function, name, after, before, order)
+        return _startup_command(
+            function,
+            name,
+            after,
+            before,
+            order,
+            lazy,
+            timeout,
+            background,
+            blocking,
+            resources,
+            shutdown_timeout,
+        )
 
 
 def _startup_command(
@@ -338,6 +953,12 @@ def _startup_command(
     after: Optional[Collection[str]] = None,
     before: Optional[Collection[str]] = None,
     order: Optional[int] = None,
+    lazy: bool = False,
+    timeout: Optional[float] = None,
+    background: bool = False,
+    blocking: bool = False,
+    resources: Optional[Mapping[str, int]] = None,
+    shutdown_timeout: Optional[float] = None,
 ) -> C1:
     command: StartupCommand
     if isasyncgenfunction(function):
@@ -351,12 +972,26 @@ def _startup_command(
     else:
         raise TypeError("Function expected")
 
-    command = DependencyGraphNodeStartupCommand(command, name, after, before, order)
+    command = DependencyGraphNodeStartupCommand(
+        command,
+        name,
+        after,
+        before,
+        order,
+        lazy,
+        timeout,
+        background,
+        blocking,
+        resources,
+        shutdown_timeout,
+    )
     setattr(function, "startup_command", command)
     return function
 
 
-def import_submodules(module: ModuleType) -> Iterable[ModuleType]:
+def import_submodules(
+    module: ModuleType, executor: Optional[Executor] = None
+) -> Iterable[ModuleType]:
     yield module
 
     if module.__file__ is None:
@@ -365,8 +1000,397 @@ def import_submodules(module: ModuleType) -> Iterable[ModuleType]:
     if os.path.basename(module.__file__) != "__init__.py":
         return
 
-    for module_info in walk_packages([os.path.dirname(module.__file__)], f"{module.__name__}."):
-        yield import_module(module_info.name)
+    if executor is None:
+        for module_info in walk_packages([os.path.dirname(module.__file__)], f"{module.__name__}."):
+            yield import_module(module_info.name)
+        return
+
+    names = [
+        spec.name
+        for spec in _iter_submodule_specs(os.path.dirname(module.__file__), f"{module.__name__}.")
+    ]
+    levels: DefaultDict[int, List[str]] = defaultdict(list)
+    for name in names:
+        levels[name.count(".")].append(name)
+    modules: Dict[str, ModuleType] = {}
+    for level in sorted(levels.keys()):
+        level_names = levels[level]
+        futures = [executor.submit(import_module, name) for name in level_names]
+        wait(futures)
+        for name, future in zip(level_names, futures):
+            try:
+                modules[name] = future.result()
+            except _DeadlockError:
+                # Concurrent imports can deadlock on each other's module locks, so modules that
+                # lost the lock are imported once more on the calling thread.
+                modules[name] = import_module(name)
+    for name in names:
+        yield modules[name]
+
+
+def import_startup_command_modules(
+    module: ModuleType, manifest: Optional["DiscoveryManifest"] = None
+) -> Iterable[ModuleType]:
+    yield module
+
+    if module.__file__ is None:
+        return
+
+    if os.path.basename(module.__file__) != "__init__.py":
+        return
+
+    for spec in _iter_submodule_specs(os.path.dirname(module.__file__), f"{module.__name__}."):
+        if manifest is None:
+            commands = _scan_module(spec.origin)
+        else:
+            commands = manifest.scan(spec)
+        if commands is None or commands:
+            yield import_module(spec.name)
+
+
+def _iter_submodule_specs(path: str, prefix: str) -> Iterable[ModuleSpec]:
+    for module_info in iter_modules([path], prefix):
+        finder = cast(PathEntryFinder, module_info.module_finder)
+        spec = finder.find_spec(module_info.name)
+        if spec is None:
+            continue
+        yield spec
+        if module_info.ispkg and spec.submodule_search_locations is not None:
+            for location in spec.submodule_search_locations:
+                yield from _iter_submodule_specs(location, f"{module_info.name}.")
+
+
+_STARTUP_COMMAND_PARAMETERS = (
+    "name",
+    "after",
+    "before",
+    "order",
+    "lazy",
+    "timeout",
+    "background",
+    "blocking",
+    "resources",
+    "shutdown_timeout",
+)
+
+
+def _scan_module(path: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+    if path is None or not path.endswith(".py"):
+        return None
+    with open(path, "rb") as file:
+        tree = ast.parse(file.read(), path)
+
+    names = {"startup_command"}
+    for node in ast.walk(tree):
+        # The decorator may be re-exported by another module, so the source module is not checked.
+        if isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                if alias.name == "startup_command" and alias.asname is not None:
+                    names.add(alias.asname)
+
+    def is_reference(node: ast.AST) -> bool:
+        if isinstance(node, ast.Name):
+            return node.id in names
+        if isinstance(node, ast.Attribute):
+            return node.attr == "startup_command"
+        return False
+
+    commands: List[Dict[str, Any]] = []
+    static_references: Set[ast.AST] = set()
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        if len(node.decorator_list) != 1:
+            continue
+        decorator = node.decorator_list[0]
+        command = _scan_decorator(decorator, is_reference)
+        if command is None:
+            continue
+        command["function"] = node.name
+        commands.append(command)
+        static_references.add(decorator.func if isinstance(decorator, ast.Call) else decorator)
+
+    for node in ast.walk(tree):
+        if is_reference(node) and node not in static_references:
+            return None
+    return commands
+
+
+def _scan_decorator(
+    decorator: ast.expr, is_reference: Callable[[ast.AST], bool]
+) -> Optional[Dict[str, Any]]:
+    command: Dict[str, Any] = dict.fromkeys(_STARTUP_COMMAND_PARAMETERS)
+    if is_reference(decorator):
+        return command
+    if not isinstance(decorator, ast.Call) or not is_reference(decorator.func):
+        return None
+    if decorator.args:
+        return None
+    for keyword in decorator.keywords:
+        if keyword.arg not in _STARTUP_COMMAND_PARAMETERS:
+            return None
+        try:
+            command[keyword.arg] = _to_json_value(ast.literal_eval(keyword.value))
+        except (TypeError, ValueError):
+            return None
+    return command
+
+
+def _to_json_value(value: Any) -> Any:
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if isinstance(value, tuple):
+        return list(value)
+    return value
+
+
+class StartupCommandReference(DependencyGraphNode, StartupCommand):
+    def __init__(
+        self,
+        module: str,
+        function: str,
+        name: Optional[str] = None,
+        after: Optional[Collection[str]] = None,
+        before: Optional[Collection[str]] = None,
+        order: Optional[int] = None,
+        lazy: bool = False,
+        timeout: Optional[float] = None,
+        background: bool = False,
+        blocking: bool = False,
+        resources: Optional[Mapping[str, int]] = None,
+        shutdown_timeout: Optional[float] = None,
+    ) -> None:
+        self.__module = module
+        self.__function = function
+        self.__name = name
+        self.__after = after
+        self.__before = before
+        self.__order = order
+        self.__lazy = lazy
+        self.__timeout = timeout
+        self.__background = background
+        self.__blocking = blocking
+        self.__resources = resources
+        self.__shutdown_timeout = shutdown_timeout
+        self.__command: Optional[DependencyGraphNodeStartupCommand] = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.__module}.{self.__function}, name={self.__name!r})"
+
+    @property
+    def module(self) -> str:
+        return self.__module
+
+    @property
+    def function(self) -> str:
+        return self.__function
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.__name
+
+    @property
+    def after(self) -> Optional[Collection[str]]:
+        return self.__after
+
+    @property
+    def before(self) -> Optional[Collection[str]]:
+        return self.__before
+
+    @property
+    def order(self) -> Optional[int]:
+        return self.__order
+
+    @property
+    def lazy(self) -> bool:
+        return self.__lazy
+
+    @property
+    def timeout(self) -> Optional[float]:
+        return self.__timeout
+
+    @property
+    def background(self) -> bool:
+        return self.__background
+
+    @property
+    def blocking(self) -> bool:
+        return self.__blocking
+
+    @property
+    def resources(self) -> Optional[Mapping[str, int]]:
+        return self.__resources
+
+    @property
+    def shutdown_timeout(self) -> Optional[float]:
+        return self.__shutdown_timeout
+
+    @property
+    def command(self) -> DependencyGraphNodeStartupCommand:
+        if self.__command is None:
+            function = getattr(import_module(self.__module), self.__function, None)
+            command = getattr(function, "startup_command", None)
+            if not isinstance(command, DependencyGraphNodeStartupCommand):
+                raise Exception(
+                    f"Startup command not found: "
+                    f"module={self.__module}, function={self.__function}."
+                )
+            self.__command = command
+        return self.__command
+
+    def startup(self) -> None:
+        self.command.startup()
+
+    def shutdown(self, exception: Optional[BaseException] = None) -> None:
+        self.command.shutdown(exception)
+
+    async def startup_async(self) -> None:
+        await self.command.startup_async()
+
+    async def shutdown_async(self, exception: Optional[BaseException] = None) -> None:
+        await self.command.shutdown_async(exception)
+
+
+def _fetch_startup_command_references(module: ModuleType) -> Iterable[StartupCommandReference]:
+    for function_name, value in vars(module).items():
+        if not isfunction(value):
+            continue
+        command = getattr(value, "startup_command", None)
+        if not isinstance(command, DependencyGraphNodeStartupCommand):
+            continue
+        yield StartupCommandReference(
+            module.__name__,
+            function_name,
+            command.name,
+            command.after,
+            command.before,
+            command.order,
+            command.lazy,
+            command.timeout,
+            command.background,
+            command.blocking,
+            command.resources,
+            command.shutdown_timeout,
+        )
+
+
+class DiscoveryManifest:
+    def __init__(self, path: str, check_hash: bool = False) -> None:
+        self.__path = path
+        self.__check_hash = check_hash
+        self.__modules: Dict[str, Dict[str, Any]] = {}
+        self.__changed = False
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("version") == _MANIFEST_VERSION:
+            self.__modules = data["modules"]
+
+    def scan(self, spec: ModuleSpec) -> Optional[List[Dict[str, Any]]]:
+        path = spec.origin
+        if path is None or not path.endswith(".py"):
+            return None
+        stat = os.stat(path)
+        entry = self.__modules.get(spec.name)
+        if entry is not None and entry["path"] == path:
+            if entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                return entry["commands"]
+            if self.__check_hash and entry["sha256"] == _hash_file(path):
+                entry["mtime_ns"] = stat.st_mtime_ns
+                entry["size"] = stat.st_size
+                self.__changed = True
+                return entry["commands"]
+        commands = _scan_module(path)
+        self.__modules[spec.name] = {
+            "path": path,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": _hash_file(path) if self.__check_hash else None,
+            "commands": commands,
+        }
+        self.__changed = True
+        return commands
+
+    def discover(self, module: ModuleType) -> List[StartupCommandReference]:
+        references = _discover(module, self.scan)
+        self.save()
+        return references
+
+    def save(self) -> None:
+        if not self.__changed:
+            return
+        _write_json(self.__path, {"version": _MANIFEST_VERSION, "modules": self.__modules})
+        self.__changed = False
+
+
+_MANIFEST_VERSION = 8
+
+
+def _iter_module_specs(module: ModuleType) -> Iterable[ModuleSpec]:
+    if module.__spec__ is not None:
+        yield module.__spec__
+    if module.__file__ is not None and os.path.basename(module.__file__) == "__init__.py":
+        yield from _iter_submodule_specs(os.path.dirname(module.__file__), f"{module.__name__}.")
+
+
+def _discover(
+    module: ModuleType, scan: Callable[[ModuleSpec], Optional[List[Dict[str, Any]]]]
+) -> List[StartupCommandReference]:
+    references: List[StartupCommandReference] = []
+    for spec in _iter_module_specs(module):
+        commands = scan(spec)
+        if commands is None:
+            references.extend(_fetch_startup_command_references(import_module(spec.name)))
+            continue
+        for command in commands:
+            references.append(_to_reference(spec.name, command))
+    return references
+
+
+def _from_reference(reference: StartupCommandReference) -> Dict[str, Any]:
+    command = {
+        parameter: _to_json_value(getattr(reference, parameter))
+        for parameter in _STARTUP_COMMAND_PARAMETERS
+    }
+    command["module"] = reference.module
+    command["function"] = reference.function
+    return command
+
+
+def _to_reference(module: str, command: Mapping[str, Any]) -> StartupCommandReference:
+    return StartupCommandReference(
+        module,
+        command["function"],
+        command["name"],
+        command["after"],
+        command["before"],
+        command["order"],
+        bool(command["lazy"]),
+        command["timeout"],
+        bool(command["background"]),
+        bool(command["blocking"]),
+        command["resources"],
+        command["shutdown_timeout"],
+    )
+
+
+def _write_json(path: str, data: Any) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def _hash_file(path: str) -> str:
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
 
 
 def fetch_startup_commands(module: ModuleType) -> Iterable[DependencyGraphNodeStartupCommand]:
@@ -395,73 +1419,210 @@ def pairwise(items: Sequence[T]) -> Iterable[Tuple[T, T]]:
 N = TypeVar("N", bound=DependencyGraphNode)
 
 
-def to_graph(nodes: Iterable[N]) -> Dict[N, Set[N]]:
-    graph: Dict[N, Set[N]] = {}
-    for node in nodes:
-        graph[node] = set()
-
-    name_to_node: Dict[str, N] = {}
-    for node in graph.keys():
+def _iter_dependencies(nodes: Sequence[N]) -> Iterable[Tuple[int, int]]:
+    name_to_index: Dict[str, int] = {}
+    for index, node in enumerate(nodes):
         name = node.name
         if name is None:
             continue
-        name_to_node[name] = node
+        name_to_index[name] = index
 
-    for next_node in graph.keys():
+    for next_index, next_node in enumerate(nodes):
         prev_names = next_node.after
         if prev_names is None:
             continue
         for prev_name in prev_names:
             try:
-                prev_node = name_to_node[prev_name]
+                prev_index = name_to_index[prev_name]
             except KeyError:
                 raise Exception(f"Dependency graph node not found: name={prev_name}.") from None
-            graph[next_node].add(prev_node)
+            yield prev_index, next_index
 
-    for prev_node in graph.keys():
+    for prev_index, prev_node in enumerate(nodes):
         next_names = prev_node.before
         if next_names is None:
             continue
         for next_name in next_names:
             try:
-                next_node = name_to_node[next_name]
+                next_index = name_to_index[next_name]
             except KeyError:
                 raise Exception(f"Dependency graph node not found: name={next_name}.") from None
-            graph[next_node].add(prev_node)
+            yield prev_index, next_index
 
-    order_to_nodes: DefaultDict[int, Set[N]] = defaultdict(set)
-    for node in graph.keys():
+
+def _group_by_order(nodes: Sequence[N]) -> Sequence[Sequence[int]]:
+    order_to_indices: DefaultDict[int, List[int]] = defaultdict(list)
+    for index, node in enumerate(nodes):
         order = node.order
         if order is None:
             continue
-        order_to_nodes[order].add(node)
+        order_to_indices[order].append(index)
+    return [order_to_indices[order] for order in sorted(order_to_indices.keys())]
 
-    orders = sorted(order_to_nodes.keys())
-    for prev_order, next_order in pairwise(orders):
-        for next_node in order_to_nodes[next_order]:
-            for prev_node in order_to_nodes[prev_order]:
-                graph[next_node].add(prev_node)
+
+def to_graph(nodes: Iterable[N]) -> Dict[N, Set[N]]:
+    unique_nodes = list(dict.fromkeys(nodes))
+    graph: Dict[N, Set[N]] = {node: set() for node in unique_nodes}
+    for prev_index, next_index in _iter_dependencies(unique_nodes):
+        graph[unique_nodes[next_index]].add(unique_nodes[prev_index])
+
+    for prev_indices, next_indices in pairwise(_group_by_order(unique_nodes)):
+        for next_index in next_indices:
+            for prev_index in prev_indices:
+                graph[unique_nodes[next_index]].add(unique_nodes[prev_index])
 
     return graph
 
 
-def get_nodes(graph: Dict[T, Set[T]]) -> Collection[T]:
-    nodes: Set[T] = set()
-    for k, v in graph.items():
-        nodes.add(k)
+def get_nodes(graph: Mapping[T, AbstractSet[T]]) -> Collection[T]:
+    nodes: Dict[T, None] = dict.fromkeys(graph)
+    for v in graph.values():
         for i in v:
-            nodes.add(i)
-    return nodes
+            nodes[i] = None
+    return nodes.keys()
 
 
 def reverse_graph(graph: Dict[T, Set[T]]) -> Dict[T, Set[T]]:
-    reversed_graph: Dict[T, Set[T]] = {node: set() for node in get_nodes(graph)}
+    reversed_graph: Dict[T, Set[T]] = {node: set() for node in graph}
     for k, v in graph.items():
         for i in v:
-            reversed_graph[i].add(k)
+            try:
+                reversed_graph[i].add(k)
+            except KeyError:
+                reversed_graph[i] = {k}
     return reversed_graph
 
 
+def get_subgraph(graph: Dict[T, Set[T]], targets: Iterable[T]) -> Dict[T, Set[T]]:
+    selected: Set[T] = set()
+    pending = list(targets)
+    while pending:
+        node = pending.pop()
+        if node in selected:
+            continue
+        selected.add(node)
+        pending.extend(graph.get(node, ()))
+    return {node: set(graph.get(node, ())) for node in get_nodes(graph) if node in selected}
+
+
+def to_subgraph(nodes: Iterable[N], targets: Iterable[str]) -> Dict[N, Set[N]]:
+    graph = to_graph(nodes)
+    named_nodes = {node.name: node for node in graph if node.name is not None}
+    target_nodes = []
+    for name in targets:
+        try:
+            target_nodes.append(named_nodes[name])
+        except KeyError:
+            raise Exception(f"Dependency graph node not found: name={name!r}.") from None
+    return get_subgraph(graph, target_nodes)
+
+
+def _to_csr(buckets: Sequence[Sequence[int]]) -> Tuple["array[int]", "array[int]"]:
+    offsets = array("i", accumulate(map(len, buckets), initial=0))
+    return offsets, array("i", chain.from_iterable(buckets))
+
+
+class CompactGraph(Generic[T]):
+    def __init__(
+        self, nodes: Sequence[T], edges: Iterable[Tuple[int, int]], barriers: int = 0
+    ) -> None:
+        self.__nodes = tuple(nodes)
+        self.__indices = {node: index for index, node in enumerate(self.__nodes)}
+        self.__size = size = len(self.__nodes) + barriers
+        successors: List[List[int]] = [[] for _ in range(size)]
+        predecessors: List[List[int]] = [[] for _ in range(size)]
+        try:
+            for source, target in edges:
+                if source < 0 or target < 0:
+                    raise IndexError
+                successors[source].append(target)
+                predecessors[target].append(source)
+        except IndexError:
+            raise ValueError(f"Invalid edge index: size={size}.") from None
+        self.__successor_offsets, self.__successor_targets = _to_csr(successors)
+        self.__predecessor_offsets, self.__predecessor_targets = _to_csr(predecessors)
+
+    @property
+    def nodes(self) -> Sequence[T]:
+        return self.__nodes
+
+    @property
+    def successor_offsets(self) -> "array[int]":
+        return self.__successor_offsets
+
+    @property
+    def successor_targets(self) -> "array[int]":
+        return self.__successor_targets
+
+    @property
+    def predecessor_offsets(self) -> "array[int]":
+        return self.__predecessor_offsets
+
+    @property
+    def predecessor_targets(self) -> "array[int]":
+        return self.__predecessor_targets
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    def __len__(self) -> int:
+        return len(self.__nodes)
+
+    def is_barrier(self, index: int) -> bool:
+        return index >= len(self.__nodes)
+
+    def index(self, node: T) -> int:
+        try:
+            return self.__indices[node]
+        except KeyError:
+            raise Exception(f"Dependency graph node not found: node={node!r}.") from None
+
+    def successors(self, index: int) -> Sequence[int]:
+        offsets = self.__successor_offsets
+        return self.__successor_targets[offsets[index] : offsets[index + 1]]
+
+    def predecessors(self, index: int) -> Sequence[int]:
+        offsets = self.__predecessor_offsets
+        return self.__predecessor_targets[offsets[index] : offsets[index + 1]]
+
+
+def compact_graph(graph: Mapping[T, AbstractSet[T]]) -> CompactGraph[T]:
+    nodes = list(get_nodes(graph))
+    indices = {node: index for index, node in enumerate(nodes)}
+    return CompactGraph(nodes, ((indices[i], indices[k]) for k, v in graph.items() for i in v))
+
+
+def to_compact_graph(nodes: Iterable[N]) -> CompactGraph[N]:
+    unique_nodes = list(dict.fromkeys(nodes))
+    groups = _group_by_order(unique_nodes)
+    return CompactGraph(
+        unique_nodes,
+        chain(_iter_dependencies(unique_nodes), _iter_barrier_edges(len(unique_nodes), groups)),
+        max(len(groups) - 1, 0),
+    )
+
+
+def _iter_barrier_edges(barrier: int, groups: Sequence[Sequence[int]]) -> Iterable[Tuple[int, int]]:
+    for prev_indices, next_indices in pairwise(groups):
+        for prev_index in prev_indices:
+            yield prev_index, barrier
+        for next_index in next_indices:
+            yield barrier, next_index
+        barrier += 1
+
+
+class GraphEdge(NamedTuple):
+    prev_node: Any
+    next_node: Any
+    kind: Optional[str]
+
+
+class GraphCycle(NamedTuple):
+    nodes: Sequence[Any]
+    edges: Sequence[GraphEdge]
+
+
 class GraphCycleException(Exception):
     def __init__(self, cycle: Sequence, *args: Any) -> None:
         super().__init__(cycle, *args)
@@ -470,33 +1631,1372 @@ class GraphCycleException(Exception):
     def cycle(self) -> Sequence:
         return self.args[0]
 
+    @property
+    def cycles(self) -> Sequence[GraphCycle]:
+        return self.args[1] if len(self.args) > 1 else []
+
+
+def find_cycles(graph: Union[Mapping[T, AbstractSet[T]], CompactGraph[T]]) -> Sequence[GraphCycle]:
+    if not isinstance(graph, CompactGraph):
+        graph = compact_graph(graph)
+    nodes = graph.nodes
+    offsets = graph.successor_offsets
+    targets = graph.successor_targets
+    cycles: List[GraphCycle] = []
+    for component in reversed(_find_components(graph)):
+        members = set(component)
+        if len(component) == 1 and component[0] not in graph.successors(component[0]):
+            continue
+        edges: Dict[Tuple[int, int], None] = {}
+        for index in sorted(component):
+            if graph.is_barrier(index):
+                continue
+            for next_index in targets[offsets[index] : offsets[index + 1]]:
+                if next_index not in members:
+                    continue
+                if not graph.is_barrier(next_index):
+                    edges[index, next_index] = None
+                    continue
+                for barrier_next_index in graph.successors(next_index):
+                    if barrier_next_index in members:
+                        edges[index, barrier_next_index] = None
+        cycles.append(
+            GraphCycle(
+                [nodes[index] for index in sorted(component) if not graph.is_barrier(index)],
+                [
+                    GraphEdge(nodes[prev_index], nodes[next_index], kind)
+                    for prev_index, next_index in edges
+                    for kind in _get_edge_kinds(nodes[prev_index], nodes[next_index])
+                ],
+            )
+        )
+    return cycles
+
+
+def validate_graph(graph: Union[Mapping[T, AbstractSet[T]], CompactGraph[T]]) -> None:
+    cycles = find_cycles(graph)
+    if cycles:
+        raise GraphCycleException(cycles[0].nodes, cycles)
+
+
+def _find_components(graph: CompactGraph) -> List[List[int]]:
+    offsets = graph.successor_offsets
+    targets = graph.successor_targets
+    indices = [-1] * graph.size
+    lowlinks = [0] * graph.size
+    on_stack = [False] * graph.size
+    stack: List[int] = []
+    components: List[List[int]] = []
+    counter = count()
+    for root in range(graph.size):
+        if indices[root] >= 0:
+            continue
+        indices[root] = lowlinks[root] = next(counter)
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, offsets[root])]
+        while work:
+            index, position = work[-1]
+            if position < offsets[index + 1]:
+                work[-1] = (index, position + 1)
+                next_index = targets[position]
+                if indices[next_index] < 0:
+                    indices[next_index] = lowlinks[next_index] = next(counter)
+                    stack.append(next_index)
+                    on_stack[next_index] = True
+                    work.append((next_index, offsets[next_index]))
+                elif on_stack[next_index]:
+                    lowlinks[index] = min(lowlinks[index], indices[next_index])
+                continue
+            work.pop()
+            if work:
+                prev_index = work[-1][0]
+                lowlinks[prev_index] = min(lowlinks[prev_index], lowlinks[index])
+            if lowlinks[index] == indices[index]:
+                component: List[int] = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == index:
+                        break
+                components.append(component)
+    return components
+
+
+def _get_edge_kinds(prev_node: Any, next_node: Any) -> Sequence[Optional[str]]:
+    if not isinstance(prev_node, DependencyGraphNode):
+        return [None]
+    if not isinstance(next_node, DependencyGraphNode):
+        return [None]
+    kinds: List[Optional[str]] = []
+    if prev_node.name is not None and prev_node.name in (next_node.after or ()):
+        kinds.append("after")
+    if next_node.name is not None and next_node.name in (prev_node.before or ()):
+        kinds.append("before")
+    if prev_node.order is not None and next_node.order is not None:
+        if prev_node.order < next_node.order:
+            kinds.append("order")
+    return kinds or [None]
+
+
+def topological_sort(graph: Union[Dict[T, Set[T]], CompactGraph[T]]) -> Sequence[T]:
+    if isinstance(graph, CompactGraph):
+        nodes = graph.nodes
+        return [nodes[index] for index in _topological_sort(graph) if index < len(nodes)]
 
-def topological_sort(graph: Dict[T, Set[T]]) -> Sequence[T]:
-    def helper(node: T) -> Optional[Sequence[T]]:
-        if node in visited:
-            return None
-        if node in current_visited:
-            return path[path.index(node) :]
-        current_visited.add(node)
+    reversed_graph = reverse_graph(graph)
+    remaining = {node: len(graph.get(node, ())) for node in reversed_graph}
+    sorted_nodes = [node for node, count in remaining.items() if count == 0]
+    for node in sorted_nodes:
+        for next_node in reversed_graph[node]:
+            remaining[next_node] -= 1
+            if remaining[next_node] == 0:
+                sorted_nodes.append(next_node)
+    if len(sorted_nodes) < len(remaining):
+        node = next(node for node, count in remaining.items() if count > 0)
+        raise GraphCycleException(
+            _find_cycle(node, graph.__getitem__, remaining.__getitem__), find_cycles(graph)
+        )
+    return sorted_nodes
+
+
+def _topological_sort(graph: CompactGraph) -> Sequence[int]:
+    predecessor_offsets = graph.predecessor_offsets
+    successor_offsets = graph.successor_offsets
+    successor_targets = graph.successor_targets
+    remaining = array("i", map(sub, predecessor_offsets[1:], predecessor_offsets[:-1]))
+    sorted_indices = [index for index, count in enumerate(remaining) if count == 0]
+    for index in sorted_indices:
+        for next_index in successor_targets[
+            successor_offsets[index] : successor_offsets[index + 1]
+        ]:
+            remaining[next_index] -= 1
+            if remaining[next_index] == 0:
+                sorted_indices.append(next_index)
+    if len(sorted_indices) < len(remaining):
+        index = next(index for index, count in enumerate(remaining) if count > 0)
+        cycle = _find_cycle(index, graph.predecessors, remaining.__getitem__)
+        raise GraphCycleException(
+            [graph.nodes[index] for index in cycle if not graph.is_barrier(index)],
+            find_cycles(graph),
+        )
+    return sorted_indices
+
+
+def _find_cycle(
+    node: T, get_predecessors: Callable[[T], Iterable[T]], get_remaining: Callable[[T], int]
+) -> Sequence[T]:
+    path: List[T] = []
+    positions: Dict[T, int] = {}
+    while node not in positions:
+        positions[node] = len(path)
         path.append(node)
-        parent_nodes = reversed_graph[node]
-        for parent_node in parent_nodes:
-            cycle = helper(parent_node)
-            if cycle:
-                return cycle
-        visited.add(node)
-        current_visited.remove(node)
-        path.pop()
-        sorted_nodes.append(node)
+        node = next(
+            prev_node for prev_node in get_predecessors(node) if get_remaining(prev_node) > 0
+        )
+    return path[positions[node] :]
+
+
+class StartupPlan:
+    def __init__(
+        self,
+        module: str,
+        graph: CompactGraph[StartupCommandReference],
+        order: Sequence[int],
+        levels: Sequence[int],
+        sources: Mapping[str, Sequence[Any]],
+    ) -> None:
+        self.__module = module
+        self.__graph = graph
+        self.__order = order
+        self.__levels = levels
+        self.__sources = sources
+
+    @property
+    def module(self) -> str:
+        return self.__module
+
+    @property
+    def graph(self) -> CompactGraph[StartupCommandReference]:
+        return self.__graph
+
+    @property
+    def nodes(self) -> Sequence[StartupCommandReference]:
+        return self.__graph.nodes
+
+    @property
+    def order(self) -> Sequence[int]:
+        return self.__order
+
+    @property
+    def shutdown_order(self) -> Sequence[int]:
+        return self.__order[::-1]
+
+    @property
+    def levels(self) -> Sequence[int]:
+        return self.__levels
+
+    def is_stale(self, path: Optional[str] = None) -> bool:
+        if path is None:
+            path = _find_module_file(self.__module)
+        root = os.path.dirname(path) if path is not None else ""
+        paths = {
+            os.path.relpath(source, root): source
+            for source in _iter_source_paths(self.__module, path)
+        }
+        if paths.keys() != self.__sources.keys():
+            return True
+        try:
+            for name, source in paths.items():
+                mtime_ns, size, sha256 = self.__sources[name]
+                if _stat_source(source) == [mtime_ns, size]:
+                    continue
+                if sha256 is None or _hash_file(source) != sha256:
+                    return True
+        except OSError:
+            return True
+        return False
+
+    def save(self, path: str) -> None:
+        graph = self.__graph
+        _write_json(
+            path,
+            {
+                "version": _PLAN_VERSION,
+                "module": self.__module,
+                "sources": self.__sources,
+                "commands": [_from_reference(node) for node in graph.nodes],
+                "edges": [
+                    [index, next_index]
+                    for index in range(graph.size)
+                    for next_index in graph.successors(index)
+                ],
+                "barriers": graph.size - len(graph),
+                "order": self.__order,
+                "levels": self.__levels,
+            },
+        )
+
+
+_PLAN_VERSION = 5
+
+
+def compile_startup_plan(
+    module: ModuleType, manifest: Optional[DiscoveryManifest] = None, check_hash: bool = False
+) -> StartupPlan:
+    root = os.path.dirname(module.__file__) if module.__file__ is not None else ""
+    sources = {
+        os.path.relpath(path, root): [*_stat_source(path), _hash_file(path) if check_hash else None]
+        for path in _iter_source_paths(module.__name__, module.__file__)
+    }
+    if manifest is None:
+        references = _discover(module, lambda spec: _scan_module(spec.origin))
+    else:
+        references = manifest.discover(module)
+    graph = to_compact_graph(references)
+    sorted_indices = _topological_sort(graph)
+    levels = [0] * graph.size
+    for index in sorted_indices:
+        level = levels[index] if graph.is_barrier(index) else levels[index] + 1
+        for next_index in graph.successors(index):
+            levels[next_index] = max(levels[next_index], level)
+    return StartupPlan(
+        module.__name__,
+        graph,
+        [index for index in sorted_indices if not graph.is_barrier(index)],
+        levels[: len(graph)],
+        sources,
+    )
+
+
+def load_startup_plan(
+    path: str,
+    module: Optional[ModuleType] = None,
+    manifest: Optional[DiscoveryManifest] = None,
+    check_hash: bool = False,
+) -> StartupPlan:
+    plan: Optional[StartupPlan] = None
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        data = None
+    if isinstance(data, dict) and data.get("version") == _PLAN_VERSION:
+        plan = StartupPlan(
+            data["module"],
+            CompactGraph(
+                [_to_reference(command["module"], command) for command in data["commands"]],
+                ((source, target) for source, target in data["edges"]),
+                data["barriers"],
+            ),
+            data["order"],
+            data["levels"],
+            data["sources"],
+        )
+    if plan is not None and (module is None or plan.module == module.__name__):
+        if not plan.is_stale(None if module is None else module.__file__):
+            return plan
+    if module is None:
+        raise Exception(f"Startup plan is missing or stale: path={path!r}.")
+    plan = compile_startup_plan(module, manifest, check_hash)
+    plan.save(path)
+    return plan
+
+
+def _iter_source_paths(module: str, path: Optional[str]) -> Iterable[str]:
+    if path is None:
+        return
+    yield path
+    if os.path.basename(path) == "__init__.py":
+        for spec in _iter_submodule_specs(os.path.dirname(path), f"{module}."):
+            if spec.origin is not None and spec.has_location:
+                yield spec.origin
+
+
+def _find_module_file(name: str) -> Optional[str]:
+    try:
+        spec = find_spec(name)
+    except (ImportError, ValueError):
         return None
+    return spec.origin if spec is not None and spec.has_location else None
+
+
+def _stat_source(path: str) -> Sequence[int]:
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+S = TypeVar("S", bound=StartupCommand)
+
+
+class _GraphRun:
+    def __init__(
+        self,
+        graph: CompactGraph,
+        indices: Iterable[int],
+        reverse: bool = False,
+        max_concurrency: Optional[int] = None,
+        on_done: Optional[Callable[[int], None]] = None,
+        stop_on_error: bool = True,
+        deadline: Optional[float] = None,
+        acquire: Optional[Callable[[int, Callable[[], None]], bool]] = None,
+        release: Optional[Callable[[int], None]] = None,
+    ) -> None:
+        self.__graph = graph
+        if reverse:
+            self.__offsets = graph.predecessor_offsets
+            self.__targets = graph.predecessor_targets
+            dependency_offsets = graph.successor_offsets
+            dependency_targets = graph.successor_targets
+        else:
+            self.__offsets = graph.successor_offsets
+            self.__targets = graph.successor_targets
+            dependency_offsets = graph.predecessor_offsets
+            dependency_targets = graph.predecessor_targets
+        self.__remaining: Dict[int, int] = dict.fromkeys(indices, 0)
+        for index in self.__remaining:
+            for prev_index in dependency_targets[
+                dependency_offsets[index] : dependency_offsets[index + 1]
+            ]:
+                if prev_index in self.__remaining:
+                    self.__remaining[index] += 1
+        self.__ready = deque(index for index, count in self.__remaining.items() if count == 0)
+        self.__node_count = len(graph)
+        self.__max_concurrency = max_concurrency
+        self.__on_done = on_done
+        self.__stop_on_error = stop_on_error
+        self.__running = 0
+        self.__stopped = False
+        self.__deadline = deadline
+        self.__created = perf_counter()
+        self.__starts: Dict[int, float] = {}
+        self.__acquire = acquire
+        self.__release_resources = release
+        self.__waiting: List[int] = []
+        self.__woken = False
+        self.waker: Optional[Callable[[], None]] = None
+        self.timed_out: Optional[Dict[int, float]] = None
+        self.error: Optional[BaseException] = None
+
+    @property
+    def blocked(self) -> bool:
+        return bool(self.__waiting) and self.__is_active()
+
+    def __is_active(self) -> bool:
+        return not self.__stopped and (self.error is None or not self.__stop_on_error)
+
+    def wake(self) -> None:
+        self.__woken = True
+        waker = self.waker
+        if waker is not None:
+            waker()
+
+    def pop(self) -> Optional[int]:
+        ready = self.__ready
+        if self.__woken:
+            self.__woken = False
+            ready.extendleft(reversed(self.__waiting))
+            self.__waiting = []
+        while ready and self.__is_active():
+            if ready[0] >= self.__node_count:
+                self.__release(ready.popleft())
+                continue
+            if self.__max_concurrency is not None and self.__running >= self.__max_concurrency:
+                return None
+            index = ready.popleft()
+            if self.__acquire is not None and not self.__acquire(index, self.wake):
+                self.__waiting.append(index)
+                continue
+            self.__running += 1
+            if self.__deadline is not None:
+                self.__starts[index] = perf_counter()
+            return index
+        return None
+
+    def stop(self) -> None:
+        self.__stopped = True
+
+    def get_timeout(self) -> Optional[float]:
+        if self.__deadline is None:
+            return None
+        return max(self.__deadline - perf_counter(), 0.0)
+
+    def get_timeout_exception(self) -> StartupTimeoutException:
+        now = perf_counter()
+        self.timed_out = {index: now - start for index, start in self.__starts.items()}
+        if not self.timed_out:
+            return StartupTimeoutException(
+                self.__graph.nodes[self.__waiting[0]], now - self.__created
+            )
+        index, elapsed = max(self.timed_out.items(), key=itemgetter(1))
+        return StartupTimeoutException(self.__graph.nodes[index], elapsed)
+
+    def abandon(self, index: int) -> None:
+        self.__running -= 1
+        if self.__release_resources is not None:
+            self.__release_resources(index)
+
+    def complete(self, index: int, exception: Optional[BaseException] = None) -> None:
+        self.__running -= 1
+        self.__starts.pop(index, None)
+        if self.__release_resources is not None:
+            self.__release_resources(index)
+        if exception is not None:
+            self.error = _chain_exception(exception, self.error)
+            if self.__stop_on_error:
+                return
+        elif self.__on_done is not None:
+            self.__on_done(index)
+        self.__release(index)
+
+    def __release(self, index: int) -> None:
+        remaining = self.__remaining
+        for next_index in self.__targets[self.__offsets[index] : self.__offsets[index + 1]]:
+            if next_index not in remaining:
+                continue
+            remaining[next_index] -= 1
+            if remaining[next_index] == 0:
+                self.__ready.append(next_index)
+
+
+async def _run_graph_async(run: _GraphRun, function: Callable[[int], Awaitable[None]]) -> None:
+    tasks: Dict["asyncio.Future[None]", int] = {}
+    loop = asyncio.get_running_loop()
+    wakeup = loop.create_future()
+
+    def wake() -> None:
+        loop.call_soon_threadsafe(lambda: _set_result(wakeup))
+
+    run.waker = wake
+
+    def complete(task: "asyncio.Future[None]") -> None:
+        exception = CancelledError() if task.cancelled() else task.exception()
+        run.complete(tasks.pop(task), exception)
+
+    try:
+        while True:
+            if wakeup.done():
+                wakeup = loop.create_future()
+            index = run.pop()
+            while index is not None:
+                tasks[asyncio.ensure_future(function(index))] = index
+                index = run.pop()
+            if not tasks and not run.blocked:
+                break
+            done, _ = await asyncio.wait(
+                [*tasks, wakeup], timeout=run.get_timeout(), return_when=FIRST_COMPLETED
+            )
+            if not done:
+                raise run.get_timeout_exception()
+            for task in done:
+                if task is not wakeup:
+                    complete(task)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks)
+        for task in list(tasks):
+            if run.timed_out is None:
+                complete(task)
+            else:
+                run.abandon(tasks.pop(task))
+        raise
+
+    if run.error is not None:
+        raise run.error
+
+
+def _run_graph(run: _GraphRun, function: Callable[[int], None], executor: Executor) -> None:
+    futures: Dict["Future[None]", int] = {}
+    wakeup: "Future[None]" = Future()
+    run.waker = lambda: _set_future_result(wakeup)
+
+    def complete(future: "Future[None]") -> None:
+        exception = CancelledError() if future.cancelled() else future.exception()
+        run.complete(futures.pop(future), exception)
+
+    try:
+        while True:
+            if wakeup.done():
+                wakeup = Future()
+            index = run.pop()
+            while index is not None:
+                futures[executor.submit(function, index)] = index
+                index = run.pop()
+            if not futures and not run.blocked:
+                break
+            done, _ = wait([*futures, wakeup], run.get_timeout(), FIRST_COMPLETED)
+            if not done:
+                raise run.get_timeout_exception()
+            for future in done:
+                if future is not wakeup:
+                    complete(future)
+    except StartupTimeoutException:
+        # Running threads cannot be interrupted, so they are abandoned.
+        for future, index in futures.items():
+            future.add_done_callback(_abandon(run, index))
+            future.cancel()
+        raise
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        for future in list(futures):
+            complete(future)
+        raise
+
+    if run.error is not None:
+        raise run.error
+
+
+def _get_resources(node: StartupCommand) -> Optional[Mapping[str, int]]:
+    return node.resources if isinstance(node, DependencyGraphNode) else None
+
+
+def _abandon(run: _GraphRun, index: int) -> Callable[["Future[None]"], None]:
+    return lambda future: run.abandon(index)
+
+
+def _raise_shutdown_errors(
+    error: Optional[BaseException],
+    background_exception: Optional[BaseException],
+    overruns: Mapping[StartupCommand, float],
+) -> None:
+    if background_exception is not None:
+        error = _chain_exception(background_exception, error)
+    if overruns:
+        error = _chain_exception(ShutdownTimeoutException(overruns), error)
+    if error is not None:
+        raise error
+
+
+def _wake(waiters: Iterable["asyncio.Future[None]"]) -> None:
+    for waiter in waiters:
+        waiter.get_loop().call_soon_threadsafe(_set_result, waiter)
+
+
+def _set_result(future: "asyncio.Future[None]") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _set_future_result(future: "Future[None]") -> None:
+    try:
+        future.set_result(None)
+    except InvalidStateError:
+        pass
+
+
+class GraphStartupCommand(ContextManagerStartupCommand, Generic[S]):
+    def __init__(
+        self,
+        graph: Union[Mapping[S, AbstractSet[S]], CompactGraph[S]],
+        max_concurrency: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        timeout: Optional[float] = None,
+        resource_limits: Optional[Mapping[str, int]] = None,
+        shutdown_timeout: Optional[float] = None,
+    ) -> None:
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError(f"Invalid max concurrency: max_concurrency={max_concurrency}.")
+        if timeout is not None and timeout <= 0:
+            raise ValueError(f"Invalid timeout: timeout={timeout}.")
+        if shutdown_timeout is not None and shutdown_timeout <= 0:
+            raise ValueError(f"Invalid shutdown timeout: shutdown_timeout={shutdown_timeout}.")
+        if not isinstance(graph, CompactGraph):
+            graph = compact_graph(graph)
+        self.__resources: Optional[List[Optional[Mapping[str, int]]]] = None
+        if resource_limits:
+            for resource, limit in resource_limits.items():
+                if limit < 1:
+                    raise ValueError(f"Invalid resource limit: resource={resource}, limit={limit}.")
+            self.__resources = list(map(_get_resources, graph.nodes))
+            for node, resources in zip(graph.nodes, self.__resources):
+                for resource, amount in (resources or {}).items():
+                    if amount > resource_limits.get(resource, amount):
+                        raise ValueError(
+                            f"Resource amount exceeds its limit: "
+                            f"command={node!r}, resource={resource}, amount={amount}."
+                        )
+        self.__available = dict(resource_limits or {})
+        self.__resource_waiters: DefaultDict[str, List[Callable[[], None]]] = defaultdict(list)
+        self.__graph = graph
+        self.__max_concurrency = max_concurrency
+        self.__executor = executor
+        self.__timeout = timeout
+        self.__shutdown_timeout = shutdown_timeout
+        self.__own_executor: Optional[Executor] = None
+        self.__started_indices: List[int] = []
+        self.__started: Set[int] = set()
+        self.__names: Optional[Dict[str, int]] = None
+        self.__lock = threading.Lock()
+        self.__async_lock: Optional[asyncio.Lock] = None
+        self.__pending: Set[int] = set()
+        self.__condition = threading.Condition()
+        self.__waiters: DefaultDict[int, List["asyncio.Future[None]"]] = defaultdict(list)
+        self.__background_run: Optional[_GraphRun] = None
+        self.__background_thread: Optional[threading.Thread] = None
+        self.__background_task: Optional["asyncio.Future[None]"] = None
+        self.__background_exception: Optional[BaseException] = None
+
+    def __get_executor(self) -> Executor:
+        if self.__executor is not None:
+            return self.__executor
+        if self.__own_executor is None:
+            self.__own_executor = ThreadPoolExecutor(self.__max_concurrency)
+        return self.__own_executor
+
+    def __shutdown_executor(self) -> None:
+        if self.__own_executor is not None:
+            self.__own_executor.shutdown(wait=False)
+            self.__own_executor = None
+
+    def __on_done(self, index: int) -> None:
+        with self.__condition:
+            self.__started_indices.append(index)
+            self.__started.add(index)
+            self.__pending.discard(index)
+            waiters = self.__waiters.pop(index, [])
+            self.__condition.notify_all()
+        _wake(waiters)
+
+    def __acquire_resources(self, index: int, wake: Callable[[], None]) -> bool:
+        resources = cast(List[Optional[Mapping[str, int]]], self.__resources)[index]
+        if not resources:
+            return True
+        with self.__condition:
+            available = self.__available
+            for resource, amount in resources.items():
+                if resource in available and available[resource] < amount:
+                    self.__resource_waiters[resource].append(wake)
+                    return False
+            for resource, amount in resources.items():
+                if resource in available:
+                    available[resource] -= amount
+        return True
+
+    def __release_resources(self, index: int) -> None:
+        resources = cast(List[Optional[Mapping[str, int]]], self.__resources)[index]
+        if not resources:
+            return
+        wakers: List[Callable[[], None]] = []
+        with self.__condition:
+            for resource, amount in resources.items():
+                if resource not in self.__available:
+                    continue
+                self.__available[resource] += amount
+                wakers.extend(self.__resource_waiters.pop(resource, ()))
+        for wake in wakers:
+            wake()
+
+    def __is_lazy(self, index: int) -> bool:
+        node = self.__graph.nodes[index]
+        return isinstance(node, DependencyGraphNode) and node.lazy
+
+    def __is_background(self, index: int) -> bool:
+        node = self.__graph.nodes[index]
+        return isinstance(node, DependencyGraphNode) and node.background
+
+    def __is_order_edge(self, prev_index: int, next_index: int) -> bool:
+        graph = self.__graph
+        if graph.is_barrier(next_index):
+            return True
+        kinds = _get_edge_kinds(graph.nodes[prev_index], graph.nodes[next_index])
+        return "order" in kinds and "after" not in kinds and "before" not in kinds
+
+    def __get_closure(self, indices: Iterable[int]) -> List[int]:
+        graph = self.__graph
+        closure = set(index for index in indices if index not in self.__started)
+        pending = list(closure)
+        while pending:
+            index = pending.pop()
+            for prev_index in graph.predecessors(index):
+                if prev_index in closure or prev_index in self.__started:
+                    continue
+                # Order groups must not force lazy commands, only explicit dependencies do.
+                if self.__is_lazy(prev_index) and self.__is_order_edge(prev_index, index):
+                    continue
+                closure.add(prev_index)
+                pending.append(prev_index)
+        return sorted(closure)
+
+    def __get_startup_indices(self) -> Tuple[Sequence[int], Sequence[int]]:
+        indices: Sequence[int] = range(self.__graph.size)
+        lazy_indices = set(filter(self.__is_lazy, range(len(self.__graph))))
+        if lazy_indices:
+            indices = self.__get_closure(index for index in indices if index not in lazy_indices)
+        background_indices = set(filter(self.__is_background, range(len(self.__graph))))
+        if not background_indices:
+            return indices, []
+        critical_indices = set(
+            self.__get_closure(
+                index
+                for index in indices
+                if not self.__graph.is_barrier(index) and index not in background_indices
+            )
+        )
+        return sorted(critical_indices), [
+            index for index in indices if index not in critical_indices
+        ]
+
+    def __get_startup_run(self, indices: Iterable[int]) -> _GraphRun:
+        deadline = None if self.__timeout is None else perf_counter() + self.__timeout
+        return self.__get_run(indices, deadline)
+
+    def __get_background_run(self, indices: Iterable[int]) -> _GraphRun:
+        run = self.__get_run(indices)
+        with self.__condition:
+            self.__pending = set(index for index in indices if not self.__graph.is_barrier(index))
+        self.__background_run = run
+        self.__background_exception = None
+        return run
+
+    def __run_background(self, run: _GraphRun) -> None:
+        nodes = self.__graph.nodes
+        try:
+            _run_graph(run, lambda index: _call(nodes[index], "startup"), self.__get_executor())
+        except BaseException as e:
+            self.__background_exception = e
+        finally:
+            self.__finish_background()
+
+    async def __run_background_async(self, run: _GraphRun) -> None:
+        nodes = self.__graph.nodes
+        try:
+            await _run_graph_async(run, lambda index: _call_async(nodes[index], "startup_async"))
+        except BaseException as e:
+            self.__background_exception = e
+        finally:
+            self.__finish_background()
+
+    def __finish_background(self) -> None:
+        with self.__condition:
+            self.__pending = set()
+            waiters = list(chain.from_iterable(self.__waiters.values()))
+            self.__waiters.clear()
+            self.__condition.notify_all()
+        _wake(waiters)
+
+    def __stop_background(self) -> Optional[BaseException]:
+        if self.__background_run is not None:
+            self.__background_run.stop()
+            self.__background_run = None
+        if self.__background_thread is not None:
+            self.__background_thread.join()
+            self.__background_thread = None
+        exception = self.__background_exception
+        self.__background_exception = None
+        return exception
+
+    async def __stop_background_async(self) -> Optional[BaseException]:
+        if self.__background_run is not None:
+            self.__background_run.stop()
+            self.__background_run = None
+        if self.__background_task is not None:
+            await self.__background_task
+            self.__background_task = None
+        exception = self.__background_exception
+        self.__background_exception = None
+        return exception
+
+    def __get_started(self, index: int) -> S:
+        node = self.__graph.nodes[index]
+        if index in self.__started:
+            return node
+        if self.__background_exception is not None:
+            raise self.__background_exception
+        raise Exception(f"Startup command is not started: command={node!r}.")
+
+    async def __wait_async(self, indices: Callable[[], Iterable[int]]) -> None:
+        while True:
+            with self.__condition:
+                index = next((index for index in indices() if index in self.__pending), None)
+                if index is None:
+                    return
+                waiter = asyncio.get_running_loop().create_future()
+                self.__waiters[index].append(waiter)
+            await waiter
+
+    def __get_run(self, indices: Iterable[int], deadline: Optional[float] = None) -> _GraphRun:
+        return _GraphRun(
+            self.__graph,
+            indices,
+            max_concurrency=self.__max_concurrency,
+            on_done=self.__on_done,
+            deadline=deadline,
+            acquire=None if self.__resources is None else self.__acquire_resources,
+            release=None if self.__resources is None else self.__release_resources,
+        )
+
+    def __get_index(self, target: Union[str, S]) -> int:
+        if not isinstance(target, str):
+            return self.__graph.index(target)
+        if self.__names is None:
+            self.__names = {}
+            for index, node in enumerate(self.__graph.nodes):
+                if isinstance(node, DependencyGraphNode) and node.name is not None:
+                    self.__names[node.name] = index
+        try:
+            return self.__names[target]
+        except KeyError:
+            raise Exception(f"Startup command not found: name={target!r}.") from None
+
+    def __get_shutdown_run(self) -> _GraphRun:
+        deadline = None
+        if self.__shutdown_timeout is not None:
+            deadline = perf_counter() + self.__shutdown_timeout
+        started_indices = self.__started_indices[::-1]
+        self.__started_indices = []
+        self.__started = set()
+        return _GraphRun(
+            self.__graph,
+            chain(started_indices, range(len(self.__graph), self.__graph.size)),
+            reverse=True,
+            max_concurrency=self.__max_concurrency,
+            stop_on_error=False,
+            deadline=deadline,
+            acquire=None if self.__resources is None else self.__acquire_resources,
+            release=None if self.__resources is None else self.__release_resources,
+        )
+
+    def startup(self) -> None:
+        indices, background_indices = self.__get_startup_indices()
+        nodes = self.__graph.nodes
+        try:
+            _run_graph(
+                self.__get_startup_run(indices),
+                lambda index: _call(nodes[index], "startup"),
+                self.__get_executor(),
+            )
+        except BaseException as e:
+            if isinstance(e, StartupTimeoutException):
+                # The abandoned command still holds a worker, so teardown must not queue behind it.
+                self.__shutdown_executor()
+            self.shutdown(e)
+            raise e
+        if background_indices:
+            self.__background_thread = threading.Thread(
+                target=self.__run_background,
+                args=(self.__get_background_run(background_indices),),
+                daemon=True,
+            )
+            self.__background_thread.start()
+
+    def __get_shutdown_timeout(self, index: int) -> Optional[float]:
+        node: StartupCommand = self.__graph.nodes[index]
+        return node.shutdown_timeout if isinstance(node, DependencyGraphNode) else None
+
+    def __get_shutdown_errors(
+        self, run: _GraphRun, error: BaseException, overruns: Dict[StartupCommand, float]
+    ) -> Optional[BaseException]:
+        if run.timed_out is None:
+            return error
+        # Commands still running at the deadline are abandoned and the rest are skipped.
+        for index, elapsed in run.timed_out.items():
+            overruns[self.__graph.nodes[index]] = elapsed
+        return run.error
+
+    def shutdown(self, exception: Optional[BaseException] = None) -> None:
+        background_exception = self.__stop_background()
+        nodes = self.__graph.nodes
+        overruns: Dict[StartupCommand, float] = {}
+
+        def shutdown(index: int) -> None:
+            node = nodes[index]
+            timeout = self.__get_shutdown_timeout(index)
+            if timeout is None:
+                _call(node, "shutdown", exception)
+                return
+            elapsed = _call_with_timeout(
+                f"shutdown:{node!r}", lambda: _call(node, "shutdown", exception), timeout
+            )
+            if elapsed is not None:
+                overruns[node] = elapsed
+
+        run = self.__get_shutdown_run()
+        error: Optional[BaseException] = None
+        try:
+            _run_graph(run, shutdown, self.__get_executor())
+        except BaseException as e:
+            error = self.__get_shutdown_errors(run, e, overruns)
+        finally:
+            self.__shutdown_executor()
+        _raise_shutdown_errors(error, background_exception, overruns)
+
+    async def startup_async(self) -> None:
+        indices, background_indices = self.__get_startup_indices()
+        nodes = self.__graph.nodes
+        try:
+            await _run_graph_async(
+                self.__get_startup_run(indices),
+                lambda index: _call_async(nodes[index], "startup_async"),
+            )
+        except BaseException as e:
+            await self.shutdown_async(e)
+            raise e
+        if background_indices:
+            self.__background_task = asyncio.ensure_future(
+                self.__run_background_async(self.__get_background_run(background_indices))
+            )
+
+    async def shutdown_async(self, exception: Optional[BaseException] = None) -> None:
+        background_exception = await self.__stop_background_async()
+        nodes = self.__graph.nodes
+        overruns: Dict[StartupCommand, float] = {}
+
+        async def shutdown_async(index: int) -> None:
+            node = nodes[index]
+            timeout = self.__get_shutdown_timeout(index)
+            if timeout is None:
+                await _call_async(node, "shutdown_async", exception)
+                return
+            start = perf_counter()
+            try:
+                await asyncio.wait_for(_call_async(node, "shutdown_async", exception), timeout)
+            except asyncio.TimeoutError:
+                overruns[node] = perf_counter() - start
+
+        run = self.__get_shutdown_run()
+        error: Optional[BaseException] = None
+        try:
+            await _run_graph_async(run, shutdown_async)
+        except BaseException as e:
+            error = self.__get_shutdown_errors(run, e, overruns)
+        _raise_shutdown_errors(error, background_exception, overruns)
+
+    def wait_for(self, target: Union[str, S]) -> S:
+        index = self.__get_index(target)
+        with self.__condition:
+            self.__condition.wait_for(lambda: index not in self.__pending)
+        return self.__get_started(index)
+
+    async def wait_for_async(self, target: Union[str, S]) -> S:
+        index = self.__get_index(target)
+        await self.__wait_async(lambda: [index])
+        return self.__get_started(index)
+
+    def require(self, target: Union[str, S]) -> S:
+        index = self.__get_index(target)
+        nodes = self.__graph.nodes
+        with self.__lock:
+            with self.__condition:
+                self.__condition.wait_for(
+                    lambda: self.__pending.isdisjoint(self.__get_closure([index]))
+                )
+            if index not in self.__started:
+                _run_graph(
+                    self.__get_run(self.__get_closure([index])),
+                    lambda index: _call(nodes[index], "startup"),
+                    self.__get_executor(),
+                )
+        return nodes[index]
+
+    async def require_async(self, target: Union[str, S]) -> S:
+        index = self.__get_index(target)
+        nodes = self.__graph.nodes
+        if self.__async_lock is None:
+            self.__async_lock = asyncio.Lock()
+        async with self.__async_lock:
+            await self.__wait_async(lambda: self.__get_closure([index]))
+            if index not in self.__started:
+                await _run_graph_async(
+                    self.__get_run(self.__get_closure([index])),
+                    lambda index: _call_async(nodes[index], "startup_async"),
+                )
+        return nodes[index]
+
+
+class EventLoopThreadStartupCommand(ContextManagerStartupCommand):
+    def __init__(self, command: StartupCommand) -> None:
+        self.__command = command
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__thread: Optional[threading.Thread] = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.__command!r})"
+
+    @property
+    def command(self) -> StartupCommand:
+        return self.__command
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        return self.__loop
+
+    def __run(self, awaitable: Awaitable[None]) -> None:
+        loop = cast(asyncio.AbstractEventLoop, self.__loop)
+        asyncio.run_coroutine_threadsafe(_await(awaitable), loop).result()
+
+    def __stop(self) -> None:
+        loop = cast(asyncio.AbstractEventLoop, self.__loop)
+        try:
+            self.__run(loop.shutdown_asyncgens())
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            cast(threading.Thread, self.__thread).join()
+            loop.close()
+            self.__loop = None
+            self.__thread = None
+
+    def startup(self) -> None:
+        if self.__loop is not None:
+            return
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name="startup-event-loop", daemon=True)
+        thread.start()
+        self.__loop = loop
+        self.__thread = thread
+        try:
+            self.__run(self.__command.startup_async())
+        except BaseException:
+            self.__stop()
+            raise
+
+    def shutdown(self, exception: Optional[BaseException] = None) -> None:
+        if self.__loop is None:
+            return
+        try:
+            self.__run(self.__command.shutdown_async(exception))
+        finally:
+            self.__stop()
+
+    async def startup_async(self) -> None:
+        await self.__command.startup_async()
+
+    async def shutdown_async(self, exception: Optional[BaseException] = None) -> None:
+        await self.__command.shutdown_async(exception)
+
+
+async def _await(awaitable: Awaitable[None]) -> None:
+    await awaitable
+
+
+def run_until_signal(
+    command: StartupCommand, signals: Collection[int] = (signal.SIGTERM, signal.SIGINT)
+) -> None:
+    # Handlers are installed only after startup, so a signal during startup still interrupts it.
+    command.startup()
+    try:
+        event = threading.Event()
+        handlers = {
+            signal_number: signal.signal(signal_number, lambda *args: event.set())
+            for signal_number in signals
+        }
+        try:
+            # Waiting in slices lets the main thread run signal handlers on every platform.
+            while not event.wait(1):
+                pass
+        finally:
+            for signal_number, handler in handlers.items():
+                signal.signal(signal_number, handler)
+    finally:
+        command.shutdown()
+
+
+async def run_until_signal_async(
+    command: StartupCommand, signals: Collection[int] = (signal.SIGTERM, signal.SIGINT)
+) -> None:
+    await command.startup_async()
+    try:
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        for signal_number in signals:
+            loop.add_signal_handler(signal_number, event.set)
+        try:
+            await event.wait()
+        finally:
+            for signal_number in signals:
+                loop.remove_signal_handler(signal_number)
+    finally:
+        await command.shutdown_async()
+
+
+class TraceEvent(NamedTuple):
+    command: StartupCommand
+    name: str
+    method: str
+    start: int
+    end: int
+    thread_id: int
+    task_id: Optional[int]
+    outcome: str
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.__events: List[TraceEvent] = []
+        self.__start = perf_counter_ns()
+        self.__previous_tracer: Optional[Tracer] = None
+
+    def __enter__(self) -> "Tracer":
+        global _tracer
+        self.__previous_tracer = _tracer
+        _tracer = self
+        return self
+
+    def __exit__(
+        self,
+        exception_type: Optional[Type[BaseException]],
+        exception: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        global _tracer
+        _tracer = self.__previous_tracer
+        self.__previous_tracer = None
+
+    @property
+    def events(self) -> Sequence[TraceEvent]:
+        return self.__events
+
+    @contextmanager
+    def trace(self, command: StartupCommand, method: str) -> Iterator[None]:
+        start = perf_counter_ns()
+        outcome = "ok"
+        try:
+            yield
+        except BaseException as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            end = perf_counter_ns()
+            task = _get_current_task()
+            self.__events.append(
+                TraceEvent(
+                    command,
+                    _get_command_name(command),
+                    method,
+                    start,
+                    end,
+                    threading.get_ident(),
+                    None if task is None else id(task),
+                    outcome,
+                )
+            )
+
+    def durations(self, method: str = "startup") -> Dict[StartupCommand, float]:
+        durations: Dict[StartupCommand, float] = {}
+        for event in self.__events:
+            if event.method == method:
+                duration = (event.end - event.start) / 1e9
+                durations[event.command] = durations.get(event.command, 0.0) + duration
+        return durations
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        process_id = os.getpid()
+        events = [
+            {
+                "name": event.name,
+                "cat": event.method,
+                "ph": "X",
+                "ts": (event.start - self.__start) / 1000,
+                "dur": (event.end - event.start) / 1000,
+                "pid": process_id,
+                "tid": event.thread_id if event.task_id is None else event.task_id,
+                "args": {
+                    "thread_id": event.thread_id,
+                    "task_id": event.task_id,
+                    "outcome": event.outcome,
+                },
+            }
+            for event in self.__events
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_chrome_trace(), file)
+
+
+_tracer: Optional[Tracer] = None
+_NULL_CONTEXT: ContextManager[None] = nullcontext()
+
+
+def _trace(command: StartupCommand, method: str) -> ContextManager[None]:
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_CONTEXT
+    return tracer.trace(command, method)
+
+
+def _call(command: StartupCommand, method: str, *args: Any) -> None:
+    with _trace(command, method):
+        getattr(command, method)(*args)
+
+
+async def _call_async(command: StartupCommand, method: str, *args: Any) -> None:
+    with _trace(command, method):
+        await getattr(command, method)(*args)
+
+
+def _get_command_name(command: StartupCommand) -> str:
+    if isinstance(command, DependencyGraphNode) and command.name is not None:
+        return command.name
+    return repr(command)
+
+
+def _get_current_task() -> "Optional[asyncio.Task[Any]]":
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+class CriticalPathReport(NamedTuple):
+    duration: float
+    path: Sequence[Any]
+    earliest_starts: Dict[Any, float]
+    slacks: Dict[Any, float]
+
+
+def analyze_critical_path(
+    graph: Union[Mapping[T, AbstractSet[T]], CompactGraph[T]], durations: Mapping[T, float]
+) -> CriticalPathReport:
+    if not isinstance(graph, CompactGraph):
+        graph = compact_graph(graph)
+    nodes = graph.nodes
+    costs = [durations.get(node, 0.0) for node in nodes] + [0.0] * (graph.size - len(nodes))
+    sorted_indices = _topological_sort(graph)
+
+    starts = [0.0] * graph.size
+    finishes = [0.0] * graph.size
+    for index in sorted_indices:
+        starts[index] = max((finishes[i] for i in graph.predecessors(index)), default=0.0)
+        finishes[index] = starts[index] + costs[index]
+    duration = max(finishes, default=0.0)
+
+    latest_finishes = [duration] * graph.size
+    for index in reversed(sorted_indices):
+        latest_finishes[index] = min(
+            (latest_finishes[i] - costs[i] for i in graph.successors(index)), default=duration
+        )
 
-    reversed_graph = reverse_graph(graph)
-    visited: Set[T] = set()
-    current_visited: Set[T] = set()
     path: List[T] = []
-    sorted_nodes: List[T] = []
-    for node in reversed_graph:
-        cycle = helper(node)
-        if cycle:
-            raise GraphCycleException(cycle[::-1])
-    return sorted_nodes[::-1]
+    current = max(range(graph.size), key=finishes.__getitem__, default=None)
+    while current is not None:
+        if current < len(nodes):
+            path.append(nodes[current])
+        start = starts[current]
+        current = next((i for i in graph.predecessors(current) if finishes[i] == start), None)
+
+    return CriticalPathReport(
+        duration,
+        path[::-1],
+        {node: starts[index] for index, node in enumerate(nodes)},
+        {node: latest_finishes[index] - finishes[index] for index, node in enumerate(nodes)},
+    )
+
+
+class SimulationReport(NamedTuple):
+    duration: float
+    starts: Dict[Any, float]
+    finishes: Dict[Any, float]
+
+
+_SIMULATION_POLICIES = ("fifo", "critical_path", "longest_first", "shortest_first")
+
+
+def simulate_startup(
+    graph: Union[Mapping[T, AbstractSet[T]], CompactGraph[T]],
+    durations: Mapping[T, float],
+    workers: Optional[int] = None,
+    policy: str = "fifo",
+) -> SimulationReport:
+    if policy not in _SIMULATION_POLICIES:
+        raise ValueError(f"Unknown simulation policy: policy={policy}.")
+    if workers is not None and workers < 1:
+        raise ValueError(f"Invalid number of workers: workers={workers}.")
+    if not isinstance(graph, CompactGraph):
+        graph = compact_graph(graph)
+    nodes = graph.nodes
+    costs = [durations.get(node, 0.0) for node in nodes] + [0.0] * (graph.size - len(nodes))
+    sorted_indices = _topological_sort(graph)
+
+    priorities: List[float] = [0.0] * graph.size
+    if policy == "critical_path":
+        for index in reversed(sorted_indices):
+            priorities[index] = -costs[index] - max(
+                (-priorities[i] for i in graph.successors(index)), default=0.0
+            )
+    elif policy == "longest_first":
+        priorities = [-cost for cost in costs]
+    elif policy == "shortest_first":
+        priorities = list(costs)
+
+    remaining = [len(graph.predecessors(index)) for index in range(graph.size)]
+    sequence = count()
+    ready = [(priorities[i], next(sequence), i) for i in range(graph.size) if remaining[i] == 0]
+    heapify(ready)
+    running: List[Tuple[float, int, int]] = []
+    starts: Dict[int, float] = {}
+    finishes: Dict[int, float] = {}
+    time = 0.0
+    compact: CompactGraph[T] = graph
+
+    def complete(index: int) -> None:
+        finishes[index] = time
+        for next_index in compact.successors(index):
+            remaining[next_index] -= 1
+            if remaining[next_index] == 0:
+                heappush(ready, (priorities[next_index], next(sequence), next_index))
+
+    while True:
+        while ready and (workers is None or len(running) < workers):
+            _, _, index = heappop(ready)
+            starts[index] = time
+            if graph.is_barrier(index):
+                complete(index)
+            else:
+                heappush(running, (time + costs[index], next(sequence), index))
+        if not running:
+            break
+        time = running[0][0]
+        while running and running[0][0] == time:
+            complete(heappop(running)[2])
+
+    return SimulationReport(
+        time,
+        {node: starts[index] for index, node in enumerate(nodes)},
+        {node: finishes[index] for index, node in enumerate(nodes)},
+    )
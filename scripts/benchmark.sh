@@ -0,0 +1,6 @@
+#!/bin/bash
+
+set -x
+set -e
+
+python -m benchmarks.graph "$@"
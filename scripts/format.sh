@@ -2,6 +2,6 @@
 
 set -x
 
-autoflake --remove-all-unused-imports --recursive --remove-unused-variables --in-place galo_startup_commands tests
-black galo_startup_commands tests
-isort galo_startup_commands tests
+autoflake --remove-all-unused-imports --recursive --remove-unused-variables --in-place galo_startup_commands tests benchmarks
+black galo_startup_commands tests benchmarks
+isort galo_startup_commands tests benchmarks
@@ -3,8 +3,8 @@
 set -x
 set -e
 
-mypy galo_startup_commands tests
-flake8 galo_startup_commands tests
-black galo_startup_commands tests --check
-isort galo_startup_commands tests --check-only
+mypy galo_startup_commands tests benchmarks
+flake8 galo_startup_commands tests benchmarks
+black galo_startup_commands tests benchmarks --check
+isort galo_startup_commands tests benchmarks --check-only
 bandit galo_startup_commands -r
@@ -0,0 +1,50 @@
+from typing import Dict, Set
+from unittest.mock import Mock
+
+import pytest
+
+from galo_startup_commands import (
+    DependencyGraphNodeStartupCommand,
+    GraphCycleException,
+    analyze_critical_path,
+    to_compact_graph,
+)
+
+
+def test_empty_graph() -> None:
+    report = analyze_critical_path({}, {})
+    assert report.duration == 0.0
+    assert list(report.path) == []
+
+
+def test_critical_path() -> None:
+    graph: Dict[str, Set[str]] = {"a": set(), "b": set(), "c": {"a", "b"}, "d": set()}
+    report = analyze_critical_path(graph, {"a": 1.0, "b": 2.0, "c": 3.0, "d": 1.0})
+    assert report.duration == 5.0
+    assert list(report.path) == ["b", "c"]
+    assert report.earliest_starts == {"a": 0.0, "b": 0.0, "c": 2.0, "d": 0.0}
+    assert report.slacks == {"a": 1.0, "b": 0.0, "c": 0.0, "d": 4.0}
+
+
+def test_missing_durations() -> None:
+    graph: Dict[str, Set[str]] = {"a": set(), "b": {"a"}}
+    report = analyze_critical_path(graph, {"b": 1.0})
+    assert report.duration == 1.0
+    assert list(report.path) == ["a", "b"]
+
+
+def test_order_groups() -> None:
+    command1 = DependencyGraphNodeStartupCommand(Mock(), order=1)
+    command2 = DependencyGraphNodeStartupCommand(Mock(), order=1)
+    command3 = DependencyGraphNodeStartupCommand(Mock(), order=2)
+    graph = to_compact_graph([command1, command2, command3])
+    report = analyze_critical_path(graph, {command1: 1.0, command2: 2.0, command3: 1.0})
+    assert report.duration == 3.0
+    assert list(report.path) == [command2, command3]
+    assert report.slacks[command1] == 1.0
+
+
+def test_cyclic_graph() -> None:
+    graph: Dict[str, Set[str]] = {"a": {"b"}, "b": {"a"}}
+    with pytest.raises(GraphCycleException):
+        analyze_critical_path(graph, {"a": 1.0, "b": 1.0})
@@ -0,0 +1,85 @@
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+from galo_startup_commands import CachedFunctionStartupCommand, ResultCache
+
+
+def build_table() -> dict:
+    return {"a": 1}
+
+
+def test_startup_computes_and_caches_result(tmp_path: Path) -> None:
+    function = Mock(return_value={"a": 1})
+    cache = ResultCache(str(tmp_path))
+    command = CachedFunctionStartupCommand(function, cache, version="1")
+    command.startup()
+    assert command.result == {"a": 1}
+
+    command = CachedFunctionStartupCommand(function, cache, version="1")
+    command.startup()
+    assert command.result == {"a": 1}
+    function.assert_called_once_with()
+
+
+def test_key_depends_on_inputs(tmp_path: Path) -> None:
+    path = tmp_path / "schema.json"
+    path.write_text("{}")
+    cache = ResultCache(str(tmp_path / "cache"))
+    command = CachedFunctionStartupCommand(build_table, cache, [str(path)], "1", {"b": 2})
+    key = command.get_key()
+    assert (
+        CachedFunctionStartupCommand(build_table, cache, [str(path)], "1", {"b": 2}).get_key()
+        == key
+    )
+    assert (
+        CachedFunctionStartupCommand(build_table, cache, [str(path)], "2", {"b": 2}).get_key()
+        != key
+    )
+    assert (
+        CachedFunctionStartupCommand(build_table, cache, [str(path)], "1", {"b": 3}).get_key()
+        != key
+    )
+    path.write_text('{"changed": true}')
+    assert command.get_key() != key
+
+
+def test_invalid_config(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        CachedFunctionStartupCommand(build_table, ResultCache(str(tmp_path)), config=object())
+
+
+def test_lambdas_have_different_keys(tmp_path: Path) -> None:
+    cache = ResultCache(str(tmp_path))
+    command1 = CachedFunctionStartupCommand(lambda: 1, cache)
+    command2 = CachedFunctionStartupCommand(lambda: 2, cache)
+    assert command1.get_key() != command2.get_key()
+    command1.startup()
+    command2.startup()
+    assert command2.result == 2
+
+
+def test_closure_without_version(tmp_path: Path) -> None:
+    value = 1
+    with pytest.raises(ValueError):
+        CachedFunctionStartupCommand(lambda: value, ResultCache(str(tmp_path)))
+    command = CachedFunctionStartupCommand(lambda: value, ResultCache(str(tmp_path)), version="1")
+    command.startup()
+    assert command.result == 1
+
+
+def test_shutdown_releases_result(tmp_path: Path) -> None:
+    command = CachedFunctionStartupCommand(build_table, ResultCache(str(tmp_path)))
+    command.startup()
+    command.shutdown()
+    assert command.result is None
+
+
+@pytest.mark.asyncio
+async def test_startup_async_and_shutdown_async(tmp_path: Path) -> None:
+    command = CachedFunctionStartupCommand(build_table, ResultCache(str(tmp_path)))
+    await command.startup_async()
+    assert command.result == {"a": 1}
+    await command.shutdown_async()
+    assert command.result is None
@@ -0,0 +1,102 @@
+from unittest.mock import Mock
+
+import pytest
+
+from galo_startup_commands import (
+    CompactGraph,
+    DependencyGraphNodeStartupCommand,
+    GraphCycleException,
+    compact_graph,
+    to_compact_graph,
+    topological_sort,
+)
+
+
+def test_empty_graph() -> None:
+    graph: CompactGraph[str] = CompactGraph([], [])
+    assert len(graph) == 0
+    assert list(graph.successor_offsets) == [0]
+    assert list(graph.predecessor_offsets) == [0]
+
+
+def test_successors_and_predecessors() -> None:
+    graph = CompactGraph(["a", "b", "c"], [(0, 2), (1, 2), (0, 1)])
+    assert sorted(graph.successors(0)) == [1, 2]
+    assert list(graph.successors(1)) == [2]
+    assert list(graph.successors(2)) == []
+    assert list(graph.predecessors(0)) == []
+    assert list(graph.predecessors(1)) == [0]
+    assert sorted(graph.predecessors(2)) == [0, 1]
+
+
+def test_index() -> None:
+    graph = CompactGraph(["a", "b"], [])
+    assert graph.index("b") == 1
+    with pytest.raises(Exception):
+        graph.index("c")
+
+
+def test_invalid_edge() -> None:
+    with pytest.raises(ValueError):
+        CompactGraph(["a"], [(0, 1)])
+
+
+def test_compact_graph() -> None:
+    graph = compact_graph({"b": {"a"}, "c": {"a", "b"}})
+    assert list(graph.nodes) == ["b", "c", "a"]
+    assert list(graph.predecessors(graph.index("a"))) == []
+    assert list(graph.predecessors(graph.index("b"))) == [graph.index("a")]
+    assert sorted(graph.successors(graph.index("a"))) == sorted(
+        [graph.index("b"), graph.index("c")]
+    )
+
+
+def test_to_compact_graph() -> None:
+    command1 = DependencyGraphNodeStartupCommand(Mock(), name="command1")
+    command2 = DependencyGraphNodeStartupCommand(Mock(), after=["command1"])
+    command3 = DependencyGraphNodeStartupCommand(Mock(), before=["command1"])
+    graph = to_compact_graph([command1, command2, command3])
+    assert list(graph.nodes) == [command1, command2, command3]
+    assert list(graph.predecessors(0)) == [2]
+    assert list(graph.predecessors(1)) == [0]
+    assert list(graph.predecessors(2)) == []
+
+
+def test_to_compact_graph_with_non_existent_command() -> None:
+    command = DependencyGraphNodeStartupCommand(Mock(), after=["non_existent_command"])
+    with pytest.raises(Exception):
+        to_compact_graph([command])
+
+
+def test_to_compact_graph_with_orders() -> None:
+    commands1 = [DependencyGraphNodeStartupCommand(Mock(), order=1) for _ in range(100)]
+    commands2 = [DependencyGraphNodeStartupCommand(Mock(), order=2) for _ in range(100)]
+    command3 = DependencyGraphNodeStartupCommand(Mock(), order=3)
+    graph = to_compact_graph([*commands1, *commands2, command3])
+    assert len(graph) == 201
+    assert graph.size == 203
+    assert graph.is_barrier(201) and graph.is_barrier(202)
+    assert len(graph.successor_targets) == 301
+    assert sorted(graph.predecessors(201)) == list(range(100))
+    assert sorted(graph.successors(201)) == list(range(100, 200))
+    assert list(graph.predecessors(200)) == [202]
+
+
+def test_topological_sort_skips_barriers() -> None:
+    command1 = DependencyGraphNodeStartupCommand(Mock(), order=1)
+    command2 = DependencyGraphNodeStartupCommand(Mock(), order=2)
+    command3 = DependencyGraphNodeStartupCommand(Mock(), order=2)
+    assert list(topological_sort(to_compact_graph([command3, command2, command1]))) == [
+        command1,
+        command3,
+        command2,
+    ]
+
+
+def test_cycle_through_barrier() -> None:
+    command1 = DependencyGraphNodeStartupCommand(Mock(), name="command1", order=1)
+    command2 = DependencyGraphNodeStartupCommand(Mock(), before=["command1"], order=2)
+    with pytest.raises(GraphCycleException) as exc_info:
+        topological_sort(to_compact_graph([command1, command2]))
+
+    assert exc_info.value.cycle in ([command1, command2], [command2, command1])
@@ -1,8 +1,16 @@
+import asyncio
+import threading
+import time
+from typing import Generator, List
 from unittest.mock import AsyncMock, Mock
 
 import pytest
 
-from galo_startup_commands import DependencyGraphNodeStartupCommand
+from galo_startup_commands import (
+    DependencyGraphNodeStartupCommand,
+    GeneratorFunctionStartupCommand,
+    StartupTimeoutException,
+)
 
 
 def test_get_name_when_name_is_none() -> None:
@@ -45,6 +53,16 @@ def test_get_order_when_order_is_not_none() -> None:
     assert command.order == 0
 
 
+def test_get_timeout() -> None:
+    command = DependencyGraphNodeStartupCommand(Mock(), timeout=1.0)
+    assert command.timeout == 1.0
+
+
+def test_invalid_timeout() -> None:
+    with pytest.raises(ValueError):
+        DependencyGraphNodeStartupCommand(Mock(), timeout=0)
+
+
 def test_startup() -> None:
     mock = Mock()
     command = DependencyGraphNodeStartupCommand(mock)
@@ -90,3 +108,104 @@ async def test_shutdown_async_with_exception() -> None:
     command = DependencyGraphNodeStartupCommand(mock)
     await command.shutdown_async(exception)
     mock.shutdown_async.assert_awaited_once_with(exception)
+
+
+def test_startup_with_timeout() -> None:
+    mock = Mock()
+    command = DependencyGraphNodeStartupCommand(mock, timeout=1.0)
+    command.startup()
+    mock.startup.assert_called_once_with()
+
+
+def test_startup_with_timeout_and_exception() -> None:
+    exception = Exception()
+    mock = Mock()
+    mock.startup.side_effect = exception
+    command = DependencyGraphNodeStartupCommand(mock, timeout=1.0)
+    with pytest.raises(Exception) as exc_info:
+        command.startup()
+    assert exc_info.value is exception
+
+
+def test_startup_timed_out() -> None:
+    mock = Mock()
+    mock.startup.side_effect = lambda: time.sleep(0.5)
+    command = DependencyGraphNodeStartupCommand(mock, timeout=0.05)
+    with pytest.raises(StartupTimeoutException) as exc_info:
+        command.startup()
+    assert exc_info.value.command is command
+    assert 0.05 <= exc_info.value.elapsed < 0.5
+
+
+@pytest.mark.asyncio
+async def test_startup_async_timed_out() -> None:
+    cancelled = asyncio.Event()
+
+    async def startup_async() -> None:
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    mock = Mock()
+    mock.startup_async = startup_async
+    command = DependencyGraphNodeStartupCommand(mock, timeout=0.05)
+    with pytest.raises(StartupTimeoutException) as exc_info:
+        await command.startup_async()
+    assert exc_info.value.command is command
+    assert exc_info.value.elapsed >= 0.05
+    assert cancelled.is_set()
+    assert "timed out" in str(exc_info.value)
+
+
+@pytest.mark.asyncio
+async def test_blocking_startup_async_does_not_block_event_loop() -> None:
+    events: List[str] = []
+
+    def startup() -> None:
+        events.append("blocking.begin")
+        time.sleep(0.1)
+        events.append("blocking.end")
+
+    async def tick() -> None:
+        await asyncio.sleep(0.01)
+        events.append("tick")
+
+    mock = Mock()
+    mock.startup.side_effect = startup
+    command = DependencyGraphNodeStartupCommand(mock, blocking=True)
+    await asyncio.gather(command.startup_async(), tick())
+    assert events == ["blocking.begin", "tick", "blocking.end"]
+    mock.startup_async.assert_not_called()
+
+    await command.shutdown_async()
+    mock.shutdown.assert_called_once_with(None)
+
+
+@pytest.mark.asyncio
+async def test_blocking_generator_resumes_on_same_thread() -> None:
+    thread_ids: List[int] = []
+
+    def function() -> Generator[None, None, None]:
+        thread_ids.append(threading.get_ident())
+        yield
+        thread_ids.append(threading.get_ident())
+
+    command = DependencyGraphNodeStartupCommand(
+        GeneratorFunctionStartupCommand(function), blocking=True
+    )
+    await command.startup_async()
+    await asyncio.sleep(0)
+    await command.shutdown_async()
+    assert len(thread_ids) == 2
+    assert thread_ids[0] == thread_ids[1] != threading.get_ident()
+
+
+@pytest.mark.asyncio
+async def test_blocking_startup_async_timed_out() -> None:
+    mock = Mock()
+    mock.startup.side_effect = lambda: time.sleep(0.5)
+    command = DependencyGraphNodeStartupCommand(mock, timeout=0.05, blocking=True)
+    with pytest.raises(StartupTimeoutException):
+        await command.startup_async()
@@ -0,0 +1,133 @@
+import sys
+import time
+from importlib import import_module
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+import galo_startup_commands
+from galo_startup_commands import (
+    DiscoveryManifest,
+    StartupCommandReference,
+    import_startup_command_modules,
+    to_graph,
+)
+
+
+@pytest.fixture
+def package(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    package = tmp_path / "test_manifest_package"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "commands.py").write_text(
+        "from galo_startup_commands import startup_command\n"
+        "\n"
+        "\n"
+        "@startup_command(name='first')\n"
+        "def first():\n"
+        "    pass\n"
+    )
+    (package / "dynamic.py").write_text(
+        "from galo_startup_commands import startup_command\n"
+        "\n"
+        "NAME = 'second'\n"
+        "\n"
+        "\n"
+        "@startup_command(name=NAME, after=['first'])\n"
+        "def second():\n"
+        "    pass\n"
+    )
+    (package / "heavy.py").write_text("raise Exception('This module must not be imported.')\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield package
+    for name in list(sys.modules):
+        if name.startswith("test_manifest_package"):
+            del sys.modules[name]
+
+
+def test_discover(package: Path, tmp_path: Path) -> None:
+    test_manifest_package = import_module("test_manifest_package")
+
+    manifest = DiscoveryManifest(str(tmp_path / "manifest.json"))
+    references = manifest.discover(test_manifest_package)
+    assert [(r.module, r.function, r.name, r.after) for r in references] == [
+        ("test_manifest_package.commands", "first", "first", None),
+        ("test_manifest_package.dynamic", "second", "second", ["first"]),
+    ]
+    assert "test_manifest_package.commands" not in sys.modules
+    assert "test_manifest_package.dynamic" in sys.modules
+    assert len(to_graph(references)) == 2
+
+    commands = import_module("test_manifest_package.commands")
+    assert references[0].command is getattr(commands.first, "startup_command")
+
+
+def test_warm_manifest(package: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    test_manifest_package = import_module("test_manifest_package")
+
+    DiscoveryManifest(str(tmp_path / "manifest.json")).discover(test_manifest_package)
+
+    def fail(path: str) -> None:
+        raise AssertionError(path)
+
+    monkeypatch.setattr(galo_startup_commands, "_scan_module", fail)
+    manifest = DiscoveryManifest(str(tmp_path / "manifest.json"))
+    assert [r.function for r in manifest.discover(test_manifest_package)] == ["first", "second"]
+
+
+def test_changed_module(package: Path, tmp_path: Path) -> None:
+    test_manifest_package = import_module("test_manifest_package")
+
+    DiscoveryManifest(str(tmp_path / "manifest.json")).discover(test_manifest_package)
+    time.sleep(0.01)
+    (package / "heavy.py").write_text(
+        "from galo_startup_commands import startup_command\n"
+        "\n"
+        "\n"
+        "@startup_command(order=1)\n"
+        "def third():\n"
+        "    pass\n"
+    )
+    manifest = DiscoveryManifest(str(tmp_path / "manifest.json"))
+    references = manifest.discover(test_manifest_package)
+    assert [(r.function, r.order) for r in references] == [
+        ("first", None),
+        ("second", None),
+        ("third", 1),
+    ]
+
+
+def test_unchanged_hash(package: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    test_manifest_package = import_module("test_manifest_package")
+
+    DiscoveryManifest(str(tmp_path / "manifest.json"), check_hash=True).discover(
+        test_manifest_package
+    )
+    time.sleep(0.01)
+    (package / "commands.py").write_text((package / "commands.py").read_text())
+
+    def fail(path: str) -> None:
+        raise AssertionError(path)
+
+    monkeypatch.setattr(galo_startup_commands, "_scan_module", fail)
+    manifest = DiscoveryManifest(str(tmp_path / "manifest.json"), check_hash=True)
+    assert [r.function for r in manifest.discover(test_manifest_package)] == ["first", "second"]
+
+
+def test_import_startup_command_modules(package: Path, tmp_path: Path) -> None:
+    test_manifest_package = import_module("test_manifest_package")
+
+    manifest = DiscoveryManifest(str(tmp_path / "manifest.json"))
+    modules = list(import_startup_command_modules(test_manifest_package, manifest))
+    assert [module.__name__ for module in modules] == [
+        "test_manifest_package",
+        "test_manifest_package.commands",
+        "test_manifest_package.dynamic",
+    ]
+
+
+def test_reference_not_found() -> None:
+    reference = StartupCommandReference("tests.test_module", "non_existent_function")
+    with pytest.raises(Exception):
+        reference.startup()
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+from typing import AsyncGenerator, List, Optional
+from unittest.mock import AsyncMock
+
+import pytest
+
+from galo_startup_commands import (
+    AsyncGeneratorFunctionStartupCommand,
+    EventLoopThreadStartupCommand,
+    GraphStartupCommand,
+    StartupCommand,
+)
+
+
+class SleepStartupCommand(StartupCommand):
+    def __init__(self, name: str, events: List[str]) -> None:
+        self.name = name
+        self.events = events
+
+    async def startup_async(self) -> None:
+        self.events.append(f"{self.name}.startup.begin")
+        await asyncio.sleep(0.01)
+        self.events.append(f"{self.name}.startup.end")
+
+    async def shutdown_async(self, exception: Optional[BaseException] = None) -> None:
+        self.events.append(f"{self.name}.shutdown")
+
+
+def test_startup_and_shutdown() -> None:
+    mock = AsyncMock()
+    command = EventLoopThreadStartupCommand(mock)
+    command.startup()
+    assert command.loop is not None
+    assert command.loop.is_running()
+    mock.startup_async.assert_awaited_once_with()
+    command.shutdown()
+    mock.shutdown_async.assert_awaited_once_with(None)
+    assert command.loop is None
+
+
+def test_independent_commands_start_concurrently() -> None:
+    events: List[str] = []
+    command1 = SleepStartupCommand("command1", events)
+    command2 = SleepStartupCommand("command2", events)
+    with EventLoopThreadStartupCommand(GraphStartupCommand({command1: set(), command2: set()})):
+        assert set(events[:2]) == {"command1.startup.begin", "command2.startup.begin"}
+    assert set(events[-2:]) == {"command1.shutdown", "command2.shutdown"}
+
+
+def test_async_generator_stays_on_loop_thread() -> None:
+    thread_ids: List[int] = []
+
+    async def function() -> AsyncGenerator[None, None]:
+        thread_ids.append(threading.get_ident())
+        yield
+        thread_ids.append(threading.get_ident())
+
+    command = EventLoopThreadStartupCommand(AsyncGeneratorFunctionStartupCommand(function))
+    command.startup()
+    command.shutdown()
+    assert len(thread_ids) == 2
+    assert thread_ids[0] == thread_ids[1] != threading.get_ident()
+
+
+def test_startup_with_exception() -> None:
+    exception = Exception()
+    mock = AsyncMock()
+    mock.startup_async.side_effect = exception
+    command = EventLoopThreadStartupCommand(mock)
+    with pytest.raises(Exception) as exc_info:
+        command.startup()
+    assert exc_info.value is exception
+    assert command.loop is None
+
+
+def test_shutdown_with_exception() -> None:
+    exception = Exception()
+    mock = AsyncMock()
+    mock.shutdown_async.side_effect = exception
+    command = EventLoopThreadStartupCommand(mock)
+    command.startup()
+    with pytest.raises(Exception) as exc_info:
+        command.shutdown()
+    assert exc_info.value is exception
+    assert command.loop is None
+
+
+@pytest.mark.asyncio
+async def test_startup_async_and_shutdown_async() -> None:
+    mock = AsyncMock()
+    command = EventLoopThreadStartupCommand(mock)
+    await command.startup_async()
+    await command.shutdown_async()
+    mock.startup_async.assert_awaited_once_with()
+    mock.shutdown_async.assert_awaited_once_with(None)
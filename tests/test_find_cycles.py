@@ -0,0 +1,91 @@
+from typing import Dict, List, Set, Union
+from unittest.mock import Mock
+
+import pytest
+
+from galo_startup_commands import (
+    CompactGraph,
+    DependencyGraphNodeStartupCommand,
+    GraphCycleException,
+    GraphEdge,
+    compact_graph,
+    find_cycles,
+    to_compact_graph,
+    to_graph,
+    topological_sort,
+    validate_graph,
+)
+
+
+def test_acyclic_graph() -> None:
+    graph: Dict[str, Set[str]] = {"a": set(), "b": {"a"}, "c": {"a", "b"}}
+    assert find_cycles(graph) == []
+    validate_graph(graph)
+
+
+def test_self_loop() -> None:
+    graph: Dict[str, Set[str]] = {"a": {"a"}, "b": {"a"}}
+    cycles = find_cycles(graph)
+    assert len(cycles) == 1
+    assert cycles[0].nodes == ["a"]
+    assert cycles[0].edges == [GraphEdge("a", "a", None)]
+
+
+def test_all_cycles_are_reported() -> None:
+    graph: Dict[str, Set[str]] = {
+        "a": {"b"},
+        "b": {"a"},
+        "c": {"b"},
+        "d": {"f"},
+        "e": {"d"},
+        "f": {"e"},
+    }
+    cycles = find_cycles(graph)
+    assert sorted(sorted(cycle.nodes) for cycle in cycles) == [["a", "b"], ["d", "e", "f"]]
+
+
+def test_compact_graph() -> None:
+    graph = compact_graph({"a": {"b"}, "b": {"a"}, "c": {"c"}})
+    assert sorted(sorted(cycle.nodes) for cycle in find_cycles(graph)) == [["a", "b"], ["c"]]
+
+
+def test_edge_kinds() -> None:
+    command1 = DependencyGraphNodeStartupCommand(
+        Mock(), name="command1", after=["command3"], before=["command2"]
+    )
+    command2 = DependencyGraphNodeStartupCommand(Mock(), name="command2", order=1)
+    command3 = DependencyGraphNodeStartupCommand(Mock(), name="command3", order=2)
+    command4 = DependencyGraphNodeStartupCommand(Mock(), name="command4", after=["command1"])
+    nodes = [command1, command2, command3, command4]
+    graphs: List[
+        Union[
+            Dict[DependencyGraphNodeStartupCommand, Set[DependencyGraphNodeStartupCommand]],
+            CompactGraph[DependencyGraphNodeStartupCommand],
+        ]
+    ] = [to_graph(nodes), to_compact_graph(nodes)]
+    for graph in graphs:
+        cycles = find_cycles(graph)
+        assert len(cycles) == 1
+        assert cycles[0].nodes == [command1, command2, command3]
+        assert set(cycles[0].edges) == {
+            GraphEdge(command1, command2, "before"),
+            GraphEdge(command2, command3, "order"),
+            GraphEdge(command3, command1, "after"),
+        }
+
+
+def test_validate_graph() -> None:
+    graph: Dict[str, Set[str]] = {"a": {"b"}, "b": {"a"}, "c": {"d"}, "d": {"c"}}
+    with pytest.raises(GraphCycleException) as exc_info:
+        validate_graph(graph)
+    assert len(exc_info.value.cycles) == 2
+
+
+def test_topological_sort_reports_all_cycles() -> None:
+    graph: Dict[str, Set[str]] = {"a": {"b"}, "b": {"a"}, "c": {"d"}, "d": {"c"}}
+    with pytest.raises(GraphCycleException) as exc_info:
+        topological_sort(graph)
+    assert len(exc_info.value.cycles) == 2
+    with pytest.raises(GraphCycleException) as exc_info:
+        topological_sort(compact_graph(graph))
+    assert len(exc_info.value.cycles) == 2
@@ -0,0 +1,761 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Set
+from unittest.mock import AsyncMock, Mock, call
+
+import pytest
+
+from galo_startup_commands import (
+    DependencyGraphNodeStartupCommand,
+    GraphStartupCommand,
+    ShutdownTimeoutException,
+    StartupCommand,
+    StartupTimeoutException,
+    compact_graph,
+    to_compact_graph,
+    to_graph,
+)
+
+
+class SleepStartupCommand(StartupCommand):
+    def __init__(self, name: str, events: List[str], delay: float = 0.01) -> None:
+        self.name = name
+        self.events = events
+        self.delay = delay
+
+    def startup(self) -> None:
+        self.events.append(f"{self.name}.startup.begin")
+        time.sleep(self.delay)
+        self.events.append(f"{self.name}.startup.end")
+
+    def shutdown(self, exception=None) -> None:
+        self.events.append(f"{self.name}.shutdown.begin")
+        time.sleep(self.delay)
+        self.events.append(f"{self.name}.shutdown.end")
+
+    async def startup_async(self) -> None:
+        self.events.append(f"{self.name}.startup.begin")
+        await asyncio.sleep(self.delay)
+        self.events.append(f"{self.name}.startup.end")
+
+    async def shutdown_async(self, exception=None) -> None:
+        self.events.append(f"{self.name}.shutdown.begin")
+        await asyncio.sleep(self.delay)
+        self.events.append(f"{self.name}.shutdown.end")
+
+
+def test_invalid_max_concurrency() -> None:
+    with pytest.raises(ValueError):
+        GraphStartupCommand({}, max_concurrency=0)
+
+
+def test_startup_and_shutdown() -> None:
+    mock = Mock()
+    graph = {mock.command1: set(), mock.command2: {mock.command1}}
+    command = GraphStartupCommand(graph)
+    command.startup()
+    command.shutdown()
+    mock.assert_has_calls(
+        [
+            call.command1.startup(),
+            call.command2.startup(),
+            call.command2.shutdown(None),
+            call.command1.shutdown(None),
+        ]
+    )
+
+
+def test_compact_graph() -> None:
+    mock = Mock()
+    graph = compact_graph({mock.command1: set(), mock.command2: {mock.command1}})
+    command = GraphStartupCommand(graph)
+    command.startup()
+    command.shutdown()
+    mock.assert_has_calls(
+        [
+            call.command1.startup(),
+            call.command2.startup(),
+            call.command2.shutdown(None),
+            call.command1.shutdown(None),
+        ]
+    )
+
+
+def test_startup_with_exception() -> None:
+    exception = Exception()
+    mock = Mock()
+    mock.command2.startup.side_effect = exception
+    graph = {mock.command1: set(), mock.command2: {mock.command1}, mock.command3: {mock.command2}}
+    command = GraphStartupCommand(graph)
+    with pytest.raises(Exception) as exc_info:
+        command.startup()
+    assert exc_info.value is exception
+    mock.command1.shutdown.assert_called_once_with(exception)
+    mock.command2.shutdown.assert_not_called()
+    mock.command3.startup.assert_not_called()
+
+
+def test_shutdown_with_exception() -> None:
+    exception = Exception()
+    mock = Mock()
+    mock.command2.shutdown.side_effect = exception
+    graph = {mock.command1: set(), mock.command2: {mock.command1}}
+    command = GraphStartupCommand(graph)
+    command.startup()
+    with pytest.raises(Exception):
+        command.shutdown()
+    mock.command1.shutdown.assert_called_once_with(None)
+
+
+def test_independent_commands_start_in_threads() -> None:
+    barrier = threading.Barrier(2, timeout=5)
+    mock = Mock()
+    mock.command1.startup.side_effect = barrier.wait
+    mock.command2.startup.side_effect = barrier.wait
+    mock.command1.shutdown.side_effect = lambda exception: barrier.wait()
+    mock.command2.shutdown.side_effect = lambda exception: barrier.wait()
+    command = GraphStartupCommand({mock.command1: set(), mock.command2: set()})
+    command.startup()
+    command.shutdown()
+
+
+def test_custom_executor() -> None:
+    mock = Mock()
+    with ThreadPoolExecutor(1) as executor:
+        command = GraphStartupCommand({mock.command1: set()}, executor=executor)
+        command.startup()
+        command.shutdown()
+        executor.submit(mock.function).result()
+    mock.command1.startup.assert_called_once_with()
+    mock.command1.shutdown.assert_called_once_with(None)
+    mock.function.assert_called_once_with()
+
+
+@pytest.mark.asyncio
+async def test_startup_async_and_shutdown_async() -> None:
+    events: List[str] = []
+    command1 = SleepStartupCommand("command1", events)
+    command2 = SleepStartupCommand("command2", events)
+    graph: Dict[StartupCommand, Set[StartupCommand]] = {command1: set(), command2: {command1}}
+    command = GraphStartupCommand(graph)
+    await command.startup_async()
+    await command.shutdown_async()
+    assert events == [
+        "command1.startup.begin",
+        "command1.startup.end",
+        "command2.startup.begin",
+        "command2.startup.end",
+        "command2.shutdown.begin",
+        "command2.shutdown.end",
+        "command1.shutdown.begin",
+        "command1.shutdown.end",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_independent_commands_start_concurrently() -> None:
+    events: List[str] = []
+    command1 = SleepStartupCommand("command1", events)
+    command2 = SleepStartupCommand("command2", events)
+    command3 = SleepStartupCommand("command3", events)
+    graph: Dict[StartupCommand, Set[StartupCommand]] = {
+        command1: set(),
+        command2: set(),
+        command3: {command1, command2},
+    }
+    command = GraphStartupCommand(graph)
+    await command.startup_async()
+    assert set(events[:2]) == {"command1.startup.begin", "command2.startup.begin"}
+    assert events[-2:] == ["command3.startup.begin", "command3.startup.end"]
+
+    events.clear()
+    await command.shutdown_async()
+    assert events[:2] == ["command3.shutdown.begin", "command3.shutdown.end"]
+    assert set(events[2:4]) == {"command1.shutdown.begin", "command2.shutdown.begin"}
+
+
+@pytest.mark.asyncio
+async def test_max_concurrency() -> None:
+    events: List[str] = []
+    command1 = SleepStartupCommand("command1", events)
+    command2 = SleepStartupCommand("command2", events)
+    graph: Dict[StartupCommand, Set[StartupCommand]] = {command1: set(), command2: set()}
+    command = GraphStartupCommand(graph, max_concurrency=1)
+    await command.startup_async()
+    assert events[0].endswith(".startup.begin") and events[1].endswith(".startup.end")
+    assert events[0].split(".")[0] == events[1].split(".")[0]
+
+
+@pytest.mark.asyncio
+async def test_startup_async_with_exception() -> None:
+    exception = Exception()
+    mock = Mock()
+    graph = {mock.command1: set(), mock.command2: {mock.command1}, mock.command3: {mock.command2}}
+    for node in graph:
+        node.startup_async = AsyncMock()
+        node.shutdown_async = AsyncMock()
+    mock.command2.startup_async.side_effect = exception
+    command = GraphStartupCommand(graph)
+    with pytest.raises(Exception) as exc_info:
+        await command.startup_async()
+    assert exc_info.value is exception
+    mock.command1.startup_async.assert_awaited_once_with()
+    mock.command1.shutdown_async.assert_awaited_once_with(exception)
+    mock.command2.shutdown_async.assert_not_called()
+    mock.command3.startup_async.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_shutdown_async_with_exception() -> None:
+    exception = Exception()
+    mock = Mock()
+    graph = {mock.command1: set(), mock.command2: {mock.command1}}
+    for node in graph:
+        node.startup_async = AsyncMock()
+        node.shutdown_async = AsyncMock()
+    mock.command2.shutdown_async.side_effect = exception
+    command = GraphStartupCommand(graph)
+    await command.startup_async()
+    with pytest.raises(Exception):
+        await command.shutdown_async()
+    mock.command1.shutdown_async.assert_awaited_once_with(None)
+
+
+@pytest.mark.asyncio
+async def test_order_groups() -> None:
+    events: List[str] = []
+    command1 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command1", events), order=1)
+    command2 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command2", events), order=1)
+    command3 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command3", events), order=2)
+    command = GraphStartupCommand(to_compact_graph([command1, command2, command3]))
+    await command.startup_async()
+    assert set(events[:2]) == {"command1.startup.begin", "command2.startup.begin"}
+    assert events[-2:] == ["command3.startup.begin", "command3.startup.end"]
+
+    events.clear()
+    await command.shutdown_async()
+    assert events[:2] == ["command3.shutdown.begin", "command3.shutdown.end"]
+    assert set(events[2:4]) == {"command1.shutdown.begin", "command2.shutdown.begin"}
+
+
+def test_lazy_commands_are_skipped_at_startup() -> None:
+    events: List[str] = []
+    command1 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command1", events))
+    command2 = DependencyGraphNodeStartupCommand(
+        SleepStartupCommand("command2", events), name="command2", lazy=True
+    )
+    command3 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command3", events), lazy=True)
+    graph: Dict[StartupCommand, Set[StartupCommand]] = {
+        command1: set(),
+        command2: {command1},
+        command3: {command2},
+    }
+    command = GraphStartupCommand(graph)
+    command.startup()
+    assert events == ["command1.startup.begin", "command1.startup.end"]
+
+    events.clear()
+    assert command.require(command3) is command3
+    assert events == [
+        "command2.startup.begin",
+        "command2.startup.end",
+        "command3.startup.begin",
+        "command3.startup.end",
+    ]
+
+    events.clear()
+    assert command.require("command2") is command2
+    assert events == []
+
+    command.shutdown()
+    assert events == [
+        "command3.shutdown.begin",
+        "command3.shutdown.end",
+        "command2.shutdown.begin",
+        "command2.shutdown.end",
+        "command1.shutdown.begin",
+        "command1.shutdown.end",
+    ]
+
+
+def test_lazy_command_required_by_eager_command() -> None:
+    events: List[str] = []
+    command1 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command1", events), lazy=True)
+    command2 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command2", events))
+    command: GraphStartupCommand[StartupCommand] = GraphStartupCommand(
+        {command1: set(), command2: {command1}}
+    )
+    command.startup()
+    assert events == [
+        "command1.startup.begin",
+        "command1.startup.end",
+        "command2.startup.begin",
+        "command2.startup.end",
+    ]
+
+
+def test_shutdown_skips_unstarted_lazy_commands() -> None:
+    events: List[str] = []
+    command1 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command1", events), order=1)
+    command2 = DependencyGraphNodeStartupCommand(
+        SleepStartupCommand("command2", events), order=1, lazy=True
+    )
+    command3 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command3", events), order=2)
+    command = GraphStartupCommand(to_compact_graph([command1, command2, command3]))
+    command.startup()
+    command.shutdown()
+    assert "command2.startup.begin" not in events
+    assert "command2.shutdown.begin" not in events
+    assert events[-2:] == ["command1.shutdown.begin", "command1.shutdown.end"]
+
+
+@pytest.mark.parametrize("to_graph_function", [to_graph, to_compact_graph])
+def test_order_groups_do_not_start_lazy_commands(to_graph_function) -> None:
+    events: List[str] = []
+    command1 = DependencyGraphNodeStartupCommand(
+        SleepStartupCommand("command1", events), order=0, lazy=True
+    )
+    command2 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command2", events), order=1)
+    command = GraphStartupCommand(to_graph_function([command1, command2]))
+    command.startup()
+    assert events == ["command2.startup.begin", "command2.startup.end"]
+
+
+def test_require_unknown_name() -> None:
+    command: GraphStartupCommand[StartupCommand] = GraphStartupCommand({})
+    with pytest.raises(Exception):
+        command.require("unknown")
+
+
+@pytest.mark.asyncio
+async def test_require_async() -> None:
+    events: List[str] = []
+    command1 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command1", events), lazy=True)
+    command2 = DependencyGraphNodeStartupCommand(
+        SleepStartupCommand("command2", events), name="command2", lazy=True
+    )
+    command: GraphStartupCommand[StartupCommand] = GraphStartupCommand(
+        {command1: set(), command2: {command1}}
+    )
+    await command.startup_async()
+    assert events == []
+
+    results = await asyncio.gather(
+        command.require_async("command2"), command.require_async("command2")
+    )
+    assert results == [command2, command2]
+    assert events == [
+        "command1.startup.begin",
+        "command1.startup.end",
+        "command2.startup.begin",
+        "command2.startup.end",
+    ]
+
+    events.clear()
+    await command.shutdown_async()
+    assert events == [
+        "command2.shutdown.begin",
+        "command2.shutdown.end",
+        "command1.shutdown.begin",
+        "command1.shutdown.end",
+    ]
+
+
+def test_invalid_timeout() -> None:
+    with pytest.raises(ValueError):
+        GraphStartupCommand({}, timeout=0)
+
+
+def test_startup_timed_out() -> None:
+    events: List[str] = []
+    command1 = SleepStartupCommand("command1", events)
+    command2 = SleepStartupCommand("command2", events, delay=0.5)
+    command: GraphStartupCommand[StartupCommand] = GraphStartupCommand(
+        {command1: set(), command2: {command1}}, timeout=0.1
+    )
+    with pytest.raises(StartupTimeoutException) as exc_info:
+        command.startup()
+    assert exc_info.value.command is command2
+    assert exc_info.value.elapsed < 0.5
+    assert "command1.shutdown.end" in events
+    assert "command2.shutdown.begin" not in events
+
+
+def test_startup_timed_out_with_max_concurrency() -> None:
+    events: List[str] = []
+    command1 = SleepStartupCommand("command1", events)
+    command2 = SleepStartupCommand("command2", events, delay=2)
+    command: GraphStartupCommand[StartupCommand] = GraphStartupCommand(
+        {command1: set(), command2: {command1}}, max_concurrency=1, timeout=0.1
+    )
+    start = time.perf_counter()
+    with pytest.raises(StartupTimeoutException):
+        command.startup()
+    assert time.perf_counter() - start < 1
+    assert "command1.shutdown.end" in events
+
+
+@pytest.mark.asyncio
+async def test_startup_async_timed_out() -> None:
+    events: List[str] = []
+    command1 = SleepStartupCommand("command1", events)
+    command2 = SleepStartupCommand("command2", events, delay=1)
+    command3 = SleepStartupCommand("command3", events)
+    graph: Dict[StartupCommand, Set[StartupCommand]] = {
+        command1: set(),
+        command2: {command1},
+        command3: {command2},
+    }
+    command = GraphStartupCommand(graph, timeout=0.1)
+    with pytest.raises(StartupTimeoutException) as exc_info:
+        await command.startup_async()
+    assert exc_info.value.command is command2
+    assert exc_info.value.elapsed < 1
+    assert events == [
+        "command1.startup.begin",
+        "command1.startup.end",
+        "command2.startup.begin",
+        "command1.shutdown.begin",
+        "command1.shutdown.end",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_startup_async_with_command_timeout() -> None:
+    events: List[str] = []
+    command1 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command1", events))
+    command2 = DependencyGraphNodeStartupCommand(
+        SleepStartupCommand("command2", events, delay=1), timeout=0.05
+    )
+    command: GraphStartupCommand[StartupCommand] = GraphStartupCommand(
+        {command1: set(), command2: {command1}}
+    )
+    with pytest.raises(StartupTimeoutException) as exc_info:
+        await command.startup_async()
+    assert exc_info.value.command is command2
+    assert events[-2:] == ["command1.shutdown.begin", "command1.shutdown.end"]
+
+
+@pytest.mark.asyncio
+async def test_background_commands() -> None:
+    events: List[str] = []
+    command1 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command1", events))
+    command2 = DependencyGraphNodeStartupCommand(
+        SleepStartupCommand("command2", events, delay=0.1), name="command2", background=True
+    )
+    command3 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command3", events))
+    graph: Dict[StartupCommand, Set[StartupCommand]] = {
+        command1: set(),
+        command2: {command1},
+        command3: {command1},
+    }
+    command = GraphStartupCommand(graph)
+    await command.startup_async()
+    assert "command3.startup.end" in events
+    assert "command2.startup.end" not in events
+
+    assert await command.wait_for_async("command2") is command2
+    assert "command2.startup.end" in events
+    assert await command.wait_for_async(command1) is command1
+
+    events.clear()
+    await command.shutdown_async()
+    assert events[-2:] == ["command1.shutdown.begin", "command1.shutdown.end"]
+    assert "command2.shutdown.end" in events
+
+
+@pytest.mark.asyncio
+async def test_background_command_required_by_critical_command() -> None:
+    events: List[str] = []
+    command1 = DependencyGraphNodeStartupCommand(
+        SleepStartupCommand("command1", events), background=True
+    )
+    command2 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command2", events))
+    command: GraphStartupCommand[StartupCommand] = GraphStartupCommand(
+        {command1: set(), command2: {command1}}
+    )
+    await command.startup_async()
+    assert events == [
+        "command1.startup.begin",
+        "command1.startup.end",
+        "command2.startup.begin",
+        "command2.startup.end",
+    ]
+    await command.shutdown_async()
+
+
+@pytest.mark.asyncio
+async def test_shutdown_async_waits_for_background_commands() -> None:
+    events: List[str] = []
+    command1 = DependencyGraphNodeStartupCommand(
+        SleepStartupCommand("command1", events, delay=0.1), background=True
+    )
+    command2 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command2", events))
+    command3 = DependencyGraphNodeStartupCommand(
+        SleepStartupCommand("command3", events), background=True
+    )
+    command: GraphStartupCommand[StartupCommand] = GraphStartupCommand(
+        {command1: set(), command2: set(), command3: {command1}}
+    )
+    await command.startup_async()
+    await asyncio.sleep(0.01)
+    await command.shutdown_async()
+    assert "command1.shutdown.end" in events
+    assert "command3.startup.begin" not in events
+
+
+@pytest.mark.asyncio
+async def test_background_command_with_exception() -> None:
+    exception = Exception()
+    mock = Mock()
+    mock.command1.startup_async = AsyncMock(side_effect=exception)
+    mock.command1.shutdown_async = AsyncMock()
+    command1 = DependencyGraphNodeStartupCommand(mock.command1, name="command1", background=True)
+    command = GraphStartupCommand({command1: set()})
+    await command.startup_async()
+    with pytest.raises(Exception) as exc_info:
+        await command.wait_for_async("command1")
+    assert exc_info.value is exception
+    with pytest.raises(Exception) as exc_info:
+        await command.shutdown_async()
+    assert exc_info.value is exception
+    mock.command1.shutdown_async.assert_not_awaited()
+
+
+def test_background_commands_in_threads() -> None:
+    events: List[str] = []
+    command1 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command1", events))
+    command2 = DependencyGraphNodeStartupCommand(
+        SleepStartupCommand("command2", events, delay=0.1), name="command2", background=True
+    )
+    command: GraphStartupCommand[StartupCommand] = GraphStartupCommand(
+        {command1: set(), command2: {command1}}
+    )
+    command.startup()
+    assert "command2.startup.end" not in events
+    assert command.wait_for("command2") is command2
+    assert "command2.startup.end" in events
+    command.shutdown()
+    assert events[-4:] == [
+        "command2.shutdown.begin",
+        "command2.shutdown.end",
+        "command1.shutdown.begin",
+        "command1.shutdown.end",
+    ]
+
+
+def test_wait_for_not_started_command() -> None:
+    command1 = DependencyGraphNodeStartupCommand(Mock(), name="command1", lazy=True)
+    command = GraphStartupCommand({command1: set()})
+    command.startup()
+    with pytest.raises(Exception):
+        command.wait_for("command1")
+    command.shutdown()
+
+
+class ResourceStartupCommand(StartupCommand):
+    lock = threading.Lock()
+
+    def __init__(
+        self, counters: Dict[str, int], peaks: Dict[str, int], resource: str, delay: float = 0.01
+    ) -> None:
+        self.counters = counters
+        self.peaks = peaks
+        self.resource = resource
+        self.delay = delay
+
+    def __enter(self) -> None:
+        with self.lock:
+            self.counters[self.resource] += 1
+            self.peaks[self.resource] = max(self.peaks[self.resource], self.counters[self.resource])
+
+    def __exit(self) -> None:
+        with self.lock:
+            self.counters[self.resource] -= 1
+
+    async def __run(self) -> None:
+        self.__enter()
+        await asyncio.sleep(self.delay)
+        self.__exit()
+
+    def startup(self) -> None:
+        self.__enter()
+        time.sleep(self.delay)
+        self.__exit()
+
+    async def startup_async(self) -> None:
+        await self.__run()
+
+    async def shutdown_async(self, exception=None) -> None:
+        await self.__run()
+
+
+def test_invalid_resource_limit() -> None:
+    with pytest.raises(ValueError):
+        GraphStartupCommand({}, resource_limits={"postgres": 0})
+
+
+def test_resource_amount_exceeds_limit() -> None:
+    node = DependencyGraphNodeStartupCommand(Mock(), resources={"postgres": 2})
+    with pytest.raises(ValueError):
+        GraphStartupCommand({node: set()}, resource_limits={"postgres": 1})
+
+
+@pytest.mark.asyncio
+async def test_resource_limits() -> None:
+    counters = {"postgres": 0, "other": 0}
+    peaks = {"postgres": 0, "other": 0}
+    nodes = [
+        DependencyGraphNodeStartupCommand(
+            ResourceStartupCommand(counters, peaks, "postgres"), resources={"postgres": 1}
+        )
+        for _ in range(6)
+    ] + [
+        DependencyGraphNodeStartupCommand(
+            ResourceStartupCommand(counters, peaks, "other"), resources={"other": 1}
+        )
+        for _ in range(4)
+    ]
+    graph: Dict[DependencyGraphNodeStartupCommand, Set[DependencyGraphNodeStartupCommand]] = {
+        node: set() for node in nodes
+    }
+    command = GraphStartupCommand(graph, resource_limits={"postgres": 2})
+    await command.startup_async()
+    assert peaks == {"postgres": 2, "other": 4}
+
+    peaks.update(postgres=0, other=0)
+    await command.shutdown_async()
+    assert peaks == {"postgres": 2, "other": 4}
+
+
+def test_resource_limits_are_shared_with_background_run() -> None:
+    counters = {"postgres": 0}
+    peaks = {"postgres": 0}
+    command1 = DependencyGraphNodeStartupCommand(
+        ResourceStartupCommand(counters, peaks, "postgres", delay=0.2),
+        background=True,
+        resources={"postgres": 1},
+    )
+    command2 = DependencyGraphNodeStartupCommand(
+        ResourceStartupCommand(counters, peaks, "postgres", delay=0.2),
+        name="command2",
+        lazy=True,
+        resources={"postgres": 1},
+    )
+    command = GraphStartupCommand(
+        {command1: set(), command2: set()}, resource_limits={"postgres": 1}
+    )
+    command.startup()
+    assert command.require("command2") is command2
+    command.wait_for(command1)
+    assert peaks == {"postgres": 1}
+
+
+@pytest.mark.asyncio
+async def test_resource_limits_are_shared_with_background_run_async() -> None:
+    counters = {"postgres": 0}
+    peaks = {"postgres": 0}
+    command1 = DependencyGraphNodeStartupCommand(
+        ResourceStartupCommand(counters, peaks, "postgres", delay=0.1),
+        background=True,
+        resources={"postgres": 1},
+    )
+    command2 = DependencyGraphNodeStartupCommand(
+        ResourceStartupCommand(counters, peaks, "postgres", delay=0.1),
+        name="command2",
+        lazy=True,
+        resources={"postgres": 1},
+    )
+    command = GraphStartupCommand(
+        {command1: set(), command2: set()}, resource_limits={"postgres": 1}
+    )
+    await command.startup_async()
+    await asyncio.sleep(0)
+    assert await command.require_async("command2") is command2
+    await command.wait_for_async(command1)
+    assert peaks == {"postgres": 1}
+
+
+@pytest.mark.asyncio
+async def test_shutdown_async_with_command_budget() -> None:
+    events: List[str] = []
+    command1 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command1", events))
+    command2 = DependencyGraphNodeStartupCommand(
+        SleepStartupCommand("command2", events, delay=1), shutdown_timeout=0.05
+    )
+    command: GraphStartupCommand[StartupCommand] = GraphStartupCommand(
+        {command1: set(), command2: {command1}}
+    )
+    await command.startup_async()
+    events.clear()
+    with pytest.raises(ShutdownTimeoutException) as exc_info:
+        await command.shutdown_async()
+    assert list(exc_info.value.overruns) == [command2]
+    assert exc_info.value.overruns[command2] < 1
+    assert events == ["command2.shutdown.begin", "command1.shutdown.begin", "command1.shutdown.end"]
+
+
+@pytest.mark.asyncio
+async def test_shutdown_async_with_deadline() -> None:
+    events: List[str] = []
+    command1 = SleepStartupCommand("command1", events)
+    command2 = SleepStartupCommand("command2", events, delay=1)
+    command3 = SleepStartupCommand("command3", events)
+    graph: Dict[StartupCommand, Set[StartupCommand]] = {
+        command1: set(),
+        command2: {command1},
+        command3: set(),
+    }
+    command = GraphStartupCommand(graph, shutdown_timeout=0.1)
+    await command.startup_async()
+    events.clear()
+    with pytest.raises(ShutdownTimeoutException) as exc_info:
+        await command.shutdown_async()
+    assert list(exc_info.value.overruns) == [command2]
+    assert "command3.shutdown.end" in events
+    assert "command1.shutdown.begin" not in events
+
+
+def test_shutdown_with_deadline() -> None:
+    events: List[str] = []
+    command1 = SleepStartupCommand("command1", events)
+    command2 = SleepStartupCommand("command2", events, delay=0.5)
+    command3 = SleepStartupCommand("command3", events)
+    graph: Dict[StartupCommand, Set[StartupCommand]] = {
+        command1: set(),
+        command2: {command1},
+        command3: {command2},
+    }
+    command = GraphStartupCommand(graph, shutdown_timeout=0.2)
+    command.startup()
+    events.clear()
+    with pytest.raises(ShutdownTimeoutException) as exc_info:
+        command.shutdown()
+    assert list(exc_info.value.overruns) == [command2]
+    assert exc_info.value.__context__ is None
+    assert events == [
+        "command3.shutdown.begin",
+        "command3.shutdown.end",
+        "command2.shutdown.begin",
+    ]
+
+
+def test_shutdown_with_command_budget() -> None:
+    events: List[str] = []
+    command1 = DependencyGraphNodeStartupCommand(SleepStartupCommand("command1", events))
+    command2 = DependencyGraphNodeStartupCommand(
+        SleepStartupCommand("command2", events, delay=0.5), shutdown_timeout=0.05
+    )
+    command: GraphStartupCommand[StartupCommand] = GraphStartupCommand(
+        {command1: set(), command2: {command1}}
+    )
+    command.startup()
+    events.clear()
+    with pytest.raises(ShutdownTimeoutException) as exc_info:
+        command.shutdown()
+    assert list(exc_info.value.overruns) == [command2]
+    assert exc_info.value.__context__ is None
+    assert events == ["command2.shutdown.begin", "command1.shutdown.begin", "command1.shutdown.end"]
+    assert f"shutdown:{command2!r}" in [thread.name for thread in threading.enumerate()]
@@ -0,0 +1,29 @@
+from galo_startup_commands import import_startup_command_modules
+
+
+def test_module_with_nested_modules() -> None:
+    import tests.test_static_module
+    import tests.test_static_module.test_commands
+    import tests.test_static_module.test_subpackage.test_aliased_commands
+    import tests.test_static_module.test_subpackage.test_reexported_commands
+
+    expected_result = [
+        tests.test_static_module,
+        tests.test_static_module.test_commands,
+        tests.test_static_module.test_subpackage.test_aliased_commands,
+        tests.test_static_module.test_subpackage.test_reexported_commands,
+    ]
+
+    assert list(import_startup_command_modules(tests.test_static_module)) == expected_result
+
+
+def test_module_without_nested_modules() -> None:
+    import tests.test_static_module.test_commands
+
+    expected_result = [
+        tests.test_static_module.test_commands,
+    ]
+
+    assert list(import_startup_command_modules(tests.test_static_module.test_commands)) == (
+        expected_result
+    )
@@ -1,3 +1,10 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from pathlib import Path
+
+import pytest
+
 from galo_startup_commands import import_submodules
 
 
@@ -25,3 +32,45 @@ def test_module_without_nested_modules() -> None:
     }
 
     assert set(import_submodules(tests.test_module.test_submodule2)) == expected_result
+
+
+def test_module_with_nested_modules_and_executor() -> None:
+    import tests.test_module
+
+    with ThreadPoolExecutor() as executor:
+        result = list(import_submodules(tests.test_module, executor))
+
+    assert result == list(import_submodules(tests.test_module))
+
+
+def test_modules_are_imported_concurrently() -> None:
+    import tests.test_parallel_module
+
+    with ThreadPoolExecutor(2) as executor:
+        result = list(import_submodules(tests.test_parallel_module, executor))
+
+    assert [module.__name__ for module in result] == [
+        "tests.test_parallel_module",
+        "tests.test_parallel_module.module1",
+        "tests.test_parallel_module.module2",
+    ]
+
+
+def test_failed_module_is_imported_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    package_path = tmp_path / "failing_package"
+    package_path.mkdir()
+    (package_path / "__init__.py").write_text("")
+    (package_path / "broken.py").write_text(
+        f"open({str(tmp_path / 'runs')!r}, 'a').write('x')\nraise RuntimeError('broken')\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    failing_package = import_module("failing_package")
+
+    try:
+        with ThreadPoolExecutor(2) as executor:
+            with pytest.raises(RuntimeError, match="broken"):
+                list(import_submodules(failing_package, executor))
+    finally:
+        sys.modules.pop("failing_package", None)
+
+    assert (tmp_path / "runs").read_text() == "x"
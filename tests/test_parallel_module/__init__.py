@@ -0,0 +1,3 @@
+import threading
+
+barrier = threading.Barrier(2, timeout=5)
@@ -0,0 +1,3 @@
+from tests.test_parallel_module import barrier
+
+barrier.wait()
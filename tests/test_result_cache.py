@@ -0,0 +1,76 @@
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Tuple
+
+import pytest
+
+from galo_startup_commands import ResultCache
+
+
+class Blob:
+    def __init__(self, data: Any) -> None:
+        self.data = data
+
+    def __reduce_ex__(self, protocol: Any) -> Tuple[Any, Tuple[Any]]:
+        return type(self), (pickle.PickleBuffer(self.data),)
+
+
+def test_invalid_max_size(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        ResultCache(str(tmp_path), max_size=-1)
+
+
+def test_load_missing_key(tmp_path: Path) -> None:
+    cache = ResultCache(str(tmp_path))
+    with pytest.raises(KeyError):
+        cache.load("missing")
+
+
+def test_store_and_load(tmp_path: Path) -> None:
+    cache = ResultCache(str(tmp_path / "cache"))
+    cache.store("key", {"table": [1, 2, 3]})
+    assert cache.load("key") == {"table": [1, 2, 3]}
+
+
+def test_load_out_of_band_buffers_without_copy(tmp_path: Path) -> None:
+    cache = ResultCache(str(tmp_path))
+    cache.store("key", [Blob(bytearray(b"first")), Blob(bytearray(b"second" * 100))])
+    blobs = cache.load("key")
+    assert [bytes(blob.data) for blob in blobs] == [b"first", b"second" * 100]
+    assert all(isinstance(blob.data, memoryview) and blob.data.readonly for blob in blobs)
+
+
+def test_load_corrupted_entry(tmp_path: Path) -> None:
+    cache = ResultCache(str(tmp_path))
+    (tmp_path / "key.pickle").write_bytes(b"corrupted")
+    with pytest.raises(KeyError):
+        cache.load("key")
+
+
+class Renamed:
+    pass
+
+
+def test_load_entry_of_renamed_class(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = ResultCache(str(tmp_path))
+    cache.store("key", Renamed())
+    monkeypatch.delitem(globals(), "Renamed")
+    with pytest.raises(KeyError):
+        cache.load("key")
+
+
+def test_evict_oldest_entries(tmp_path: Path) -> None:
+    cache = ResultCache(str(tmp_path), max_size=2500)
+    for index, key in enumerate(["key1", "key2", "key3"]):
+        cache.store(key, b"x" * 1000)
+        os.utime(tmp_path / f"{key}.pickle", ns=(index * 10 ** 9, index * 10 ** 9))
+    assert not (tmp_path / "key1.pickle").exists()
+    assert cache.load("key2") == b"x" * 1000
+    assert cache.load("key3") == b"x" * 1000
+
+
+def test_newest_entry_is_kept(tmp_path: Path) -> None:
+    cache = ResultCache(str(tmp_path), max_size=10)
+    cache.store("key", b"x" * 1000)
+    assert cache.load("key") == b"x" * 1000
@@ -0,0 +1,53 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+from unittest.mock import AsyncMock, Mock, call
+
+import pytest
+
+from galo_startup_commands import run_until_signal, run_until_signal_async
+
+
+def test_run_until_signal() -> None:
+    mock = Mock()
+    timer = threading.Timer(0.05, os.kill, (os.getpid(), signal.SIGTERM))
+    timer.start()
+    run_until_signal(mock)
+    timer.join()
+    mock.assert_has_calls([call.startup(), call.shutdown()])
+    assert signal.getsignal(signal.SIGTERM) is signal.SIG_DFL
+
+
+def test_run_until_signal_with_startup_exception() -> None:
+    exception = Exception()
+    mock = Mock()
+    mock.startup.side_effect = exception
+    with pytest.raises(Exception) as exc_info:
+        run_until_signal(mock)
+    assert exc_info.value is exception
+    mock.shutdown.assert_not_called()
+
+
+def test_run_until_signal_interrupted_during_startup() -> None:
+    mock = Mock()
+    mock.startup.side_effect = lambda: time.sleep(2)
+    timer = threading.Timer(0.1, os.kill, (os.getpid(), signal.SIGINT))
+    timer.start()
+    start = time.perf_counter()
+    with pytest.raises(KeyboardInterrupt):
+        run_until_signal(mock)
+    timer.join()
+    assert time.perf_counter() - start < 1
+    mock.shutdown.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_run_until_signal_async() -> None:
+    mock = AsyncMock()
+    asyncio.get_running_loop().call_later(0.05, os.kill, os.getpid(), signal.SIGINT)
+    await run_until_signal_async(mock)
+    mock.startup_async.assert_awaited_once_with()
+    mock.shutdown_async.assert_awaited_once_with()
+    assert signal.getsignal(signal.SIGINT) is signal.default_int_handler
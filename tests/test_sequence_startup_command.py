@@ -149,3 +149,34 @@ async def test_shutdown_async_with_exception_parameter() -> None:
             call.command1.shutdown_async(exception),
         ]
     )
+
+
+def test_shutdown_many_commands() -> None:
+    mock = Mock()
+    command = SequenceStartupCommand([mock.command] * 2_000)
+    command.startup()
+    command.shutdown()
+    assert mock.command.shutdown.call_count == 2_000
+
+
+def test_shutdown_with_multiple_exceptions() -> None:
+    exception1 = Exception()
+    exception2 = Exception()
+    mock = Mock()
+    mock.command1.shutdown.side_effect = exception1
+    mock.command2.shutdown.side_effect = exception2
+    command = SequenceStartupCommand([mock.command1, mock.command2])
+    command.startup()
+    with pytest.raises(Exception) as exc_info:
+        command.shutdown()
+    assert exc_info.value is exception1
+    assert exc_info.value.__context__ is exception2
+
+
+@pytest.mark.asyncio
+async def test_shutdown_async_many_commands() -> None:
+    mock = AsyncMock()
+    command = SequenceStartupCommand([mock.command] * 2_000)
+    await command.startup_async()
+    await command.shutdown_async()
+    assert mock.command.shutdown_async.await_count == 2_000
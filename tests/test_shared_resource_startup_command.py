@@ -0,0 +1,97 @@
+import os
+import pickle
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Tuple
+from unittest.mock import Mock
+
+import pytest
+
+from galo_startup_commands import SharedResourceStartupCommand
+
+
+class Blob:
+    def __init__(self, data: Any) -> None:
+        self.data = data
+
+    def __reduce_ex__(self, protocol: Any) -> Tuple[Any, Tuple[Any]]:
+        return type(self), (pickle.PickleBuffer(self.data),)
+
+
+def test_first_user_builds_and_last_user_cleans_up(tmp_path: Path) -> None:
+    path = str(tmp_path / "table")
+    function = Mock(return_value={"a": 1})
+    command1 = SharedResourceStartupCommand(function, path)
+    command2 = SharedResourceStartupCommand(function, path)
+
+    command1.startup()
+    command2.startup()
+    function.assert_called_once_with()
+    assert command1.result == command2.result == {"a": 1}
+
+    command1.shutdown()
+    assert command1.result is None
+    assert os.path.exists(path)
+
+    command2.shutdown()
+    assert os.listdir(tmp_path) == []
+
+
+def test_orphaned_file_is_rebuilt(tmp_path: Path) -> None:
+    path = str(tmp_path / "table")
+    code = (
+        "import os\n"
+        "from galo_startup_commands import SharedResourceStartupCommand\n"
+        f"SharedResourceStartupCommand(lambda: 'v1', {path!r}).startup()\n"
+        "os._exit(0)\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parents[1], check=True)
+    assert os.path.exists(path)
+
+    command = SharedResourceStartupCommand(lambda: "v2", path)
+    command.startup()
+    assert command.result == "v2"
+    command.shutdown()
+
+
+def test_other_version_is_rebuilt(tmp_path: Path) -> None:
+    path = str(tmp_path / "table")
+    command1 = SharedResourceStartupCommand(lambda: "v1", path, version="1")
+    command2 = SharedResourceStartupCommand(lambda: "v2", path, version="2")
+    command1.startup()
+    command2.startup()
+    assert command1.result == "v1"
+    assert command2.result == "v2"
+    command1.shutdown()
+    command2.shutdown()
+    assert os.listdir(tmp_path) == []
+
+
+def test_buffers_are_attached_without_copy(tmp_path: Path) -> None:
+    command = SharedResourceStartupCommand(lambda: Blob(bytearray(b"data")), str(tmp_path / "blob"))
+    command.startup()
+    assert isinstance(command.result.data, memoryview)
+    assert bytes(command.result.data) == b"data"
+    command.shutdown()
+
+
+def test_startup_with_exception(tmp_path: Path) -> None:
+    exception = Exception()
+    path = str(tmp_path / "table")
+    command = SharedResourceStartupCommand(Mock(side_effect=exception), path)
+    with pytest.raises(Exception) as exc_info:
+        command.startup()
+    assert exc_info.value is exception
+    assert not os.path.exists(path)
+    command.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_startup_async_and_shutdown_async(tmp_path: Path) -> None:
+    path = str(tmp_path / "table")
+    command = SharedResourceStartupCommand(lambda: [1, 2, 3], path)
+    await command.startup_async()
+    assert command.result == [1, 2, 3]
+    await command.shutdown_async()
+    assert not os.path.exists(path)
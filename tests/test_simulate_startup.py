@@ -0,0 +1,53 @@
+from typing import Dict, Set
+
+import pytest
+
+from galo_startup_commands import GraphCycleException, simulate_startup
+
+GRAPH: Dict[str, Set[str]] = {"x": set(), "y": set(), "z": set(), "w": {"z"}}
+DURATIONS = {"x": 2.0, "y": 2.0, "z": 1.0, "w": 4.0}
+
+
+def test_unlimited_workers() -> None:
+    report = simulate_startup(GRAPH, DURATIONS)
+    assert report.duration == 5.0
+    assert report.starts == {"x": 0.0, "y": 0.0, "z": 0.0, "w": 1.0}
+    assert report.finishes == {"x": 2.0, "y": 2.0, "z": 1.0, "w": 5.0}
+
+
+def test_single_worker() -> None:
+    assert simulate_startup(GRAPH, DURATIONS, workers=1).duration == 9.0
+
+
+def test_fifo_policy() -> None:
+    assert simulate_startup(GRAPH, DURATIONS, workers=2).duration == 7.0
+
+
+def test_critical_path_policy() -> None:
+    report = simulate_startup(GRAPH, DURATIONS, workers=2, policy="critical_path")
+    assert report.duration == 5.0
+    assert report.starts["w"] == 1.0
+
+
+def test_longest_first_policy() -> None:
+    assert simulate_startup(GRAPH, DURATIONS, workers=2, policy="longest_first").duration == 7.0
+
+
+def test_shortest_first_policy() -> None:
+    assert simulate_startup(GRAPH, DURATIONS, workers=2, policy="shortest_first").duration == 6.0
+
+
+def test_unknown_policy() -> None:
+    with pytest.raises(ValueError):
+        simulate_startup(GRAPH, DURATIONS, policy="unknown")
+
+
+def test_invalid_workers() -> None:
+    with pytest.raises(ValueError):
+        simulate_startup(GRAPH, DURATIONS, workers=0)
+
+
+def test_cyclic_graph() -> None:
+    graph: Dict[str, Set[str]] = {"a": {"b"}, "b": {"a"}}
+    with pytest.raises(GraphCycleException):
+        simulate_startup(graph, {"a": 1.0, "b": 1.0})
@@ -16,6 +16,12 @@ def test_without_parameters() -> None:
     assert command.after is None
     assert command.before is None
     assert command.order is None
+    assert command.lazy is False
+    assert command.timeout is None
+    assert command.background is False
+    assert command.blocking is False
+    assert command.resources is None
+    assert command.shutdown_timeout is None
 
 
 def test_with_name_parameter() -> None:
@@ -58,6 +64,74 @@ def test_with_order_parameter() -> None:
     assert command.order == 0
 
 
+def test_with_lazy_parameter() -> None:
+    @startup_command(lazy=True)
+    def startup():
+        pass
+
+    command = getattr(startup, "startup_command")
+    assert isinstance(command, DependencyGraphNodeStartupCommand)
+    assert command.lazy is True
+
+
+def test_with_timeout_parameter() -> None:
+    @startup_command(timeout=1.5)
+    def startup():
+        pass
+
+    command = getattr(startup, "startup_command")
+    assert isinstance(command, DependencyGraphNodeStartupCommand)
+    assert command.timeout == 1.5
+
+
+def test_with_background_parameter() -> None:
+    @startup_command(background=True)
+    def startup():
+        pass
+
+    command = getattr(startup, "startup_command")
+    assert isinstance(command, DependencyGraphNodeStartupCommand)
+    assert command.background is True
+
+
+def test_with_blocking_parameter() -> None:
+    @startup_command(blocking=True)
+    def startup():
+        pass
+
+    command = getattr(startup, "startup_command")
+    assert isinstance(command, DependencyGraphNodeStartupCommand)
+    assert command.blocking is True
+
+
+def test_with_blocking_parameter_on_async_function() -> None:
+    with pytest.raises(TypeError):
+
+        @startup_command(blocking=True)
+        async def startup():
+            pass
+
+
+def test_with_resources_parameter() -> None:
+    @startup_command(resources={"postgres": 1})
+    def startup():
+        pass
+
+    command = getattr(startup, "startup_command")
+    assert isinstance(command, DependencyGraphNodeStartupCommand)
+    assert command.resources == {"postgres": 1}
+
+
+def test_with_shutdown_timeout_parameter() -> None:
+    @startup_command(shutdown_timeout=2.5)
+    def startup():
+        pass
+
+    command = getattr(startup, "startup_command")
+    assert isinstance(command, DependencyGraphNodeStartupCommand)
+    assert command.shutdown_timeout == 2.5
+
+
 def test_function() -> None:
     @startup_command(order=0)
     def startup():
@@ -0,0 +1,156 @@
+import os
+import shutil
+import sys
+from importlib import import_module
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from galo_startup_commands import (
+    DiscoveryManifest,
+    GraphStartupCommand,
+    StartupCommandReference,
+    compile_startup_plan,
+    load_startup_plan,
+)
+
+
+@pytest.fixture
+def package(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    package = tmp_path / "test_plan_package"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "database.py").write_text(
+        "from galo_startup_commands import startup_command\n"
+        "\n"
+        "\n"
+        "@startup_command(name='database', order=1)\n"
+        "def database():\n"
+        "    pass\n"
+    )
+    (package / "cache.py").write_text(
+        "from galo_startup_commands import startup_command\n"
+        "\n"
+        "\n"
+        "@startup_command(name='cache', after={'database'}, order=1, timeout=5)\n"
+        "def cache():\n"
+        "    pass\n"
+        "\n"
+        "\n"
+        "@startup_command(name='server', order=2)\n"
+        "def server():\n"
+        "    pass\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield package
+    for name in list(sys.modules):
+        if name.startswith("test_plan_package"):
+            del sys.modules[name]
+
+
+def test_compile(package: Path) -> None:
+    plan = compile_startup_plan(import_module("test_plan_package"))
+    assert plan.module == "test_plan_package"
+    assert all(isinstance(node, StartupCommandReference) for node in plan.nodes)
+    names = [plan.nodes[index].name for index in plan.order]
+    assert names == ["database", "cache", "server"]
+    assert [plan.nodes[index].name for index in plan.shutdown_order] == names[::-1]
+    levels = {node.name: level for node, level in zip(plan.nodes, plan.levels)}
+    assert levels == {"database": 0, "cache": 1, "server": 2}
+    assert "test_plan_package.cache" not in sys.modules
+    assert not plan.is_stale()
+
+
+def test_compile_with_manifest(package: Path, tmp_path: Path) -> None:
+    manifest = DiscoveryManifest(str(tmp_path / "manifest.json"))
+    plan = compile_startup_plan(import_module("test_plan_package"), manifest)
+    assert len(plan.nodes) == 3
+    assert (tmp_path / "manifest.json").exists()
+
+
+def test_save_and_load(package: Path, tmp_path: Path) -> None:
+    path = str(tmp_path / "plan.json")
+    plan = compile_startup_plan(import_module("test_plan_package"))
+    plan.save(path)
+
+    loaded_plan = load_startup_plan(path)
+    assert loaded_plan.module == plan.module
+    assert [(node.module, node.function) for node in loaded_plan.nodes] == [
+        (node.module, node.function) for node in plan.nodes
+    ]
+    assert loaded_plan.order == plan.order
+    assert loaded_plan.levels == plan.levels
+    cache = next(node for node in loaded_plan.nodes if node.name == "cache")
+    assert cache.after == ["database"]
+    assert cache.timeout == 5
+
+    command = GraphStartupCommand(loaded_plan.graph)
+    command.startup()
+    command.shutdown()
+    assert "test_plan_package.cache" in sys.modules
+
+
+def test_load_missing_plan(tmp_path: Path) -> None:
+    with pytest.raises(Exception):
+        load_startup_plan(str(tmp_path / "plan.json"))
+
+
+def test_load_compiles_missing_plan(package: Path, tmp_path: Path) -> None:
+    path = tmp_path / "plan.json"
+    plan = load_startup_plan(str(path), import_module("test_plan_package"))
+    assert len(plan.nodes) == 3
+    assert path.exists()
+
+
+def test_stale_plan_is_rebuilt(package: Path, tmp_path: Path) -> None:
+    path = str(tmp_path / "plan.json")
+    module = import_module("test_plan_package")
+    load_startup_plan(path, module)
+
+    (package / "metrics.py").write_text(
+        "from galo_startup_commands import startup_command\n"
+        "\n"
+        "\n"
+        "@startup_command(name='metrics')\n"
+        "def metrics():\n"
+        "    pass\n"
+    )
+    with pytest.raises(Exception):
+        load_startup_plan(path)
+    plan = load_startup_plan(path, module)
+    assert {node.name for node in plan.nodes} == {"database", "cache", "server", "metrics"}
+    assert not load_startup_plan(path).is_stale()
+
+
+def test_modified_source_makes_plan_stale(package: Path) -> None:
+    plan = compile_startup_plan(import_module("test_plan_package"))
+    stat = os.stat(package / "cache.py")
+    os.utime(package / "cache.py", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert plan.is_stale()
+
+
+def test_relocated_plan_is_not_stale(
+    package: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = str(tmp_path / "plan.json")
+    compile_startup_plan(import_module("test_plan_package")).save(path)
+    del sys.modules["test_plan_package"]
+
+    site = tmp_path / "site"
+    shutil.copytree(package, site / "test_plan_package")
+    shutil.rmtree(package)
+    monkeypatch.syspath_prepend(str(site))
+    plan = load_startup_plan(path)
+    assert not plan.is_stale()
+    assert not plan.is_stale(str(site / "test_plan_package" / "__init__.py"))
+
+
+def test_hash_check_ignores_touched_sources(package: Path) -> None:
+    plan = compile_startup_plan(import_module("test_plan_package"), check_hash=True)
+    stat = os.stat(package / "cache.py")
+    os.utime(package / "cache.py", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert not plan.is_stale()
+
+    (package / "cache.py").write_text("")
+    assert plan.is_stale()
@@ -0,0 +1,11 @@
+from galo_startup_commands import startup_command
+
+
+@startup_command
+def startup1():
+    pass
+
+
+@startup_command(name="startup2", after=["startup1"])
+async def startup2():
+    pass
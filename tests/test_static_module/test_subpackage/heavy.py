@@ -0,0 +1 @@
+raise Exception("This module must not be imported.")
@@ -0,0 +1,3 @@
+from galo_startup_commands import startup_command
+
+__all__ = ["startup_command"]
@@ -0,0 +1,12 @@
+import galo_startup_commands
+from galo_startup_commands import startup_command as command
+
+
+@command
+def startup1():
+    pass
+
+
+@galo_startup_commands.startup_command(order=1)
+def startup2():
+    yield
@@ -0,0 +1,8 @@
+from tests.test_static_module.test_subpackage.shortcuts import (
+    startup_command as command,
+)
+
+
+@command
+def startup1():
+    pass
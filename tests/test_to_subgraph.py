@@ -0,0 +1,64 @@
+from unittest.mock import Mock
+
+import pytest
+
+from galo_startup_commands import DependencyGraphNodeStartupCommand, to_subgraph
+
+
+def test_no_targets() -> None:
+    command = DependencyGraphNodeStartupCommand(Mock(), name="command")
+    assert to_subgraph([command], []) == {}
+
+
+def test_target_without_dependencies() -> None:
+    command1 = DependencyGraphNodeStartupCommand(Mock(), name="command1")
+    command2 = DependencyGraphNodeStartupCommand(Mock(), name="command2")
+    assert to_subgraph([command1, command2], ["command2"]) == {command2: set()}
+
+
+def test_transitive_after_dependencies() -> None:
+    command1 = DependencyGraphNodeStartupCommand(Mock(), name="command1")
+    command2 = DependencyGraphNodeStartupCommand(Mock(), name="command2", after=["command1"])
+    command3 = DependencyGraphNodeStartupCommand(Mock(), name="command3", after=["command2"])
+    command4 = DependencyGraphNodeStartupCommand(Mock(), name="command4", after=["command1"])
+    assert to_subgraph([command1, command2, command3, command4], ["command3"]) == {
+        command1: set(),
+        command2: {command1},
+        command3: {command2},
+    }
+
+
+def test_before_dependencies() -> None:
+    command1 = DependencyGraphNodeStartupCommand(Mock(), name="command1", before=["command2"])
+    command2 = DependencyGraphNodeStartupCommand(Mock(), name="command2")
+    command3 = DependencyGraphNodeStartupCommand(Mock(), name="command3")
+    assert to_subgraph([command1, command2, command3], ["command2"]) == {
+        command1: set(),
+        command2: {command1},
+    }
+
+
+def test_order_dependencies() -> None:
+    command1 = DependencyGraphNodeStartupCommand(Mock(), name="command1", order=1)
+    command2 = DependencyGraphNodeStartupCommand(Mock(), name="command2", order=2)
+    command3 = DependencyGraphNodeStartupCommand(Mock(), name="command3", order=2)
+    assert to_subgraph([command1, command2, command3], ["command2"]) == {
+        command1: set(),
+        command2: {command1},
+    }
+
+
+def test_multiple_targets() -> None:
+    command1 = DependencyGraphNodeStartupCommand(Mock(), name="command1")
+    command2 = DependencyGraphNodeStartupCommand(Mock(), name="command2", after=["command1"])
+    command3 = DependencyGraphNodeStartupCommand(Mock(), name="command3")
+    command4 = DependencyGraphNodeStartupCommand(Mock(), name="command4")
+    subgraph = to_subgraph([command1, command2, command3, command4], ["command2", "command3"])
+    assert subgraph == {command1: set(), command2: {command1}, command3: set()}
+    assert list(subgraph) == [command1, command2, command3]
+
+
+def test_non_existent_target() -> None:
+    command = DependencyGraphNodeStartupCommand(Mock(), name="command")
+    with pytest.raises(Exception):
+        to_subgraph([command], ["non_existent_command"])
@@ -2,7 +2,7 @@ from typing import Dict, Set
 
 import pytest
 
-from galo_startup_commands import GraphCycleException, topological_sort
+from galo_startup_commands import GraphCycleException, compact_graph, topological_sort
 
 
 def test_empty_graph() -> None:
@@ -64,3 +64,38 @@ def test_three_node_cyclic_graph() -> None:
         list(topological_sort(graph))
 
     assert exc_info.value.cycle in (["a", "b", "c"], ["b", "c", "a"], ["c", "a", "b"])
+
+
+def test_long_chain() -> None:
+    graph: Dict[int, Set[int]] = {i: {i - 1} for i in range(1, 100_000)}
+    assert list(topological_sort(graph)) == list(range(100_000))
+
+
+def test_cycle_at_the_end_of_long_chain() -> None:
+    graph: Dict[int, Set[int]] = {i: {i - 1} for i in range(1, 100_000)}
+    graph[0] = {99_999}
+    with pytest.raises(GraphCycleException) as exc_info:
+        list(topological_sort(graph))
+
+    assert len(exc_info.value.cycle) == 100_000
+
+
+def test_cycle_reachable_from_acyclic_part() -> None:
+    graph: Dict[str, Set[str]] = {"a": set(), "b": {"a", "c"}, "c": {"b"}, "d": {"c"}}
+    with pytest.raises(GraphCycleException) as exc_info:
+        list(topological_sort(graph))
+
+    assert exc_info.value.cycle in (["b", "c"], ["c", "b"])
+
+
+def test_compact_graph() -> None:
+    graph = compact_graph({"c": {"a", "b"}, "b": {"a"}})
+    assert list(topological_sort(graph)) == ["a", "b", "c"]
+
+
+def test_compact_cyclic_graph() -> None:
+    graph = compact_graph({"c": {"a"}, "b": {"c"}, "a": {"b"}})
+    with pytest.raises(GraphCycleException) as exc_info:
+        list(topological_sort(graph))
+
+    assert exc_info.value.cycle in (["a", "b", "c"], ["b", "c", "a"], ["c", "a", "b"])
@@ -0,0 +1,89 @@
+import json
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from galo_startup_commands import (
+    DependencyGraphNodeStartupCommand,
+    GraphStartupCommand,
+    SequenceStartupCommand,
+    Tracer,
+)
+
+
+def test_sequence_startup_and_shutdown() -> None:
+    command1 = DependencyGraphNodeStartupCommand(Mock(), name="command1")
+    command2 = DependencyGraphNodeStartupCommand(Mock(), name="command2")
+    command = SequenceStartupCommand([command1, command2])
+    with Tracer() as tracer:
+        command.startup()
+        command.shutdown()
+    assert [(event.name, event.method, event.outcome) for event in tracer.events] == [
+        ("command1", "startup", "ok"),
+        ("command2", "startup", "ok"),
+        ("command2", "shutdown", "ok"),
+        ("command1", "shutdown", "ok"),
+    ]
+    assert all(event.start <= event.end for event in tracer.events)
+    assert all(event.task_id is None for event in tracer.events)
+
+
+def test_exception_outcome() -> None:
+    mock = Mock()
+    mock.startup.side_effect = ValueError()
+    command = SequenceStartupCommand([mock])
+    with Tracer() as tracer:
+        with pytest.raises(ValueError):
+            command.startup()
+    assert [event.outcome for event in tracer.events] == ["ValueError"]
+
+
+def test_disabled() -> None:
+    with Tracer() as tracer:
+        pass
+    SequenceStartupCommand([Mock()]).startup()
+    assert list(tracer.events) == []
+
+
+@pytest.mark.asyncio
+async def test_nested_composites() -> None:
+    inner_command = Mock()
+    inner_command.startup_async = AsyncMock()
+    sequence = SequenceStartupCommand([inner_command])
+    command = GraphStartupCommand({sequence: set()})
+    with Tracer() as tracer:
+        await command.startup_async()
+    assert [(event.command, event.method) for event in tracer.events] == [
+        (inner_command, "startup_async"),
+        (sequence, "startup_async"),
+    ]
+    assert tracer.events[0].task_id is not None
+    assert tracer.events[0].task_id == tracer.events[1].task_id
+
+
+def test_dump(tmp_path: Path) -> None:
+    command = SequenceStartupCommand([DependencyGraphNodeStartupCommand(Mock(), name="command")])
+    with Tracer() as tracer:
+        command.startup()
+    tracer.dump(str(tmp_path / "trace.json"))
+    data = json.loads((tmp_path / "trace.json").read_text())
+    (event,) = data["traceEvents"]
+    assert event["name"] == "command"
+    assert event["cat"] == "startup"
+    assert event["ph"] == "X"
+    assert event["dur"] >= 0
+    assert event["args"]["outcome"] == "ok"
+
+
+def test_durations() -> None:
+    command1 = Mock()
+    command2 = Mock()
+    command = SequenceStartupCommand([command1, command2])
+    with Tracer() as tracer:
+        command.startup()
+        command.shutdown()
+    durations = tracer.durations()
+    assert set(durations) == {command1, command2}
+    assert all(duration >= 0 for duration in durations.values())
+    assert set(tracer.durations("shutdown")) == {command1, command2}